@@ -1,15 +1,26 @@
 """Helper functions file.
 
 This module contains helper functions for quantum information tasks.
+
+The plotting and graph libraries (matplotlib, networkx and qiskit) are only imported by the functions that use
+them, so the module can be imported quickly, and without qiskit installed, by headless workers.
 """
-import numpy as np
-import networkx as nx
-import matplotlib.pyplot as plt
+from __future__ import annotations
 
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
 
-from qiskit.visualization import plot_histogram
+import numpy as np
 from qibo import Circuit, gates
 
+# Shot aggregation shared by the challenge folders, see shared/shot_counts.py at the root of the repo:
+sys.path.append(str(Path(__file__).resolve().parents[2] / "shared"))
+from shot_counts import ShotCounts  # noqa: E402
+
+if TYPE_CHECKING:
+    import networkx as nx
+
 
 def random_state():
     """Generates a random state vector.
@@ -41,6 +52,77 @@ def print_random_state(theta, phi):
     print(f"Probabilities: prob_a={prob_a}  prob_b={prob_b}\n")
 
 
+def random_states(n_states: int, seed: int = None) -> tuple[np.ndarray, np.ndarray]:
+    """Generates a batch of random state vectors.
+
+    Args:
+        n_states (int): number of states to generate.
+        seed (int): seed of the random generator, to get reproducible states.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Randomly generated state angles thetas, phis, each of shape (n_states,).
+    """
+    rng = np.random.default_rng(seed)
+    thetas, phis = np.pi * (rng.random((2, n_states))*2-1)
+
+    return thetas, phis
+
+
+def get_states_amplitudes(thetas, phis) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Computes the coefficients and probabilities for a batch of states at once.
+
+    Args:
+        thetas: theta angles of the state vectors.
+        phis: phi angles of the state vectors.
+
+    Returns:
+        tuple[np.ndarray, ...]: Coefficients alphas, betas and probabilities probs_a, probs_b of the state vectors.
+    """
+    half_thetas = np.asarray(thetas)/2
+    cos, sin = np.cos(half_thetas), np.sin(half_thetas)
+    alphas, betas = cos.astype(complex), sin*np.exp(np.asarray(phis)*1.j)*-1.j
+
+    return alphas, betas, cos**2, sin**2
+
+
+def get_bloch_vectors(thetas, phis) -> np.ndarray:
+    """Computes the Bloch vectors for a batch of states at once.
+
+    Args:
+        thetas: theta angles of the state vectors.
+        phis: phi angles of the state vectors.
+
+    Returns:
+        np.ndarray: Bloch vectors (x, y, z) of the states, with shape (n_states, 3).
+    """
+    alphas, betas, probs_a, probs_b = get_states_amplitudes(thetas, phis)
+    coherences = np.conj(alphas)*betas
+
+    return np.stack([2*coherences.real, 2*coherences.imag, probs_a-probs_b], axis=-1)
+
+
+def create_random_states_circuits(thetas, phis, measure: bool = True) -> list[Circuit]:
+    """Generates the circuits preparing a batch of states, to simulate them.
+
+    Args:
+        thetas: theta angles of the state vectors.
+        phis: phi angles of the state vectors.
+        measure (bool): whether to add the measurement gate at the end of each circuit.
+
+    Returns:
+        list[Circuit]: One circuit per state, with a U1q gate (and a measurement).
+    """
+    circuits = []
+    for theta, phi in zip(thetas, phis):
+        circuit = Circuit(1)
+        circuit.add(gates.U1q(q=0, theta=theta, phi=phi))
+        if measure:
+            circuit.add(gates.M(0))
+        circuits.append(circuit)
+
+    return circuits
+
+
 def print_theoretical_values(state, probabilities):
     """Prints the random state vector info.
 
@@ -71,28 +153,46 @@ def print_sampled_values(samples, frequencies, sampled_probabilities):
     print(f"Samples: {samples}")
     print(f"Frequencies: {frequencies}")
     print(f"Sampled probabilities: {sampled_probabilities}")
+
+    from qiskit.visualization import plot_histogram
     return plot_histogram(sampled_probabilities)
 
 
-def get_probabilities(counts: dict) -> dict:
+def get_probabilities(counts) -> dict:
     """Returns the counts as probabilities.
 
     Args:
-        counts (dict): The counts of a results.
+        counts (dict | ShotCounts): The counts of a results, as a dictionary or as packed `ShotCounts`.
 
     Returns:
         dict: The probabilities associated to the given counts.
     """
+    if isinstance(counts, ShotCounts):
+        keys = counts.to_frequencies()
+        return dict(zip(keys, counts.probabilities().tolist()))
     norm = sum(counts.values())
     return {i: count/norm for i, count in counts.items()}
 
 
-def execute_get_samples_and_plot(circuit: Circuit, shots: int):
+def get_counts(samples: np.ndarray) -> dict:
+    """Counts the sampled outcomes, without going through a string per shot.
+
+    Args:
+        samples (np.ndarray): binary samples, with shape (shots, nqubits), as given by `result.samples()`.
+
+    Returns:
+        dict: The counts of each measured bitstring (only the ones measured at least once).
+    """
+    return ShotCounts.from_samples(samples).to_frequencies()
+
+
+def execute_get_samples_and_plot(circuit: Circuit, shots: int, print_samples: bool = False):
     """Executes circuit, gets probabilities and plots.
 
     Args:
        circuit (QuantumCircuit): Circuit to execute.
        shots (int): Number of shots.
+       print_samples (bool): Whether to also print the raw samples. Avoid it for large numbers of shots.
 
     Returns:
        Plot figure and prints of samples.
@@ -102,14 +202,20 @@ def execute_get_samples_and_plot(circuit: Circuit, shots: int):
 
     # Sampled values (with nshots):
     # (possible because we have a Measurement gate!)
-    samples = np.stack(result.samples(), axis=1)
-    frequencies = result.frequencies()
-    sampled_probabilities = get_probabilities(frequencies)
+    # The shots are only materialized if they are printed, otherwise qibo draws the counts directly.
+    if print_samples:
+        samples = result.samples()
+    counts = ShotCounts.from_result(result)
+    frequencies = counts.to_frequencies()
+    sampled_probabilities = get_probabilities(counts)
 
     print("SAMPLED VALUES:")
-    print(f"Samples: {samples}")
+    if print_samples:
+        print(f"Samples: {np.stack(samples, axis=1)}")
     print(f"Frequencies: {frequencies}")
     print(f"Sampled probabilities: {sampled_probabilities}")
+
+    from qiskit.visualization import plot_histogram
     return plot_histogram(sampled_probabilities)
 
 
@@ -122,6 +228,8 @@ def create_networkx_graph(edges: dict) -> nx.Graph:
     Returns:
         nx.Graph: Returns the constructed graph.
     """
+    import networkx as nx
+
     G = nx.Graph()
     for edge in edges:
         G.add_edge(edge[0], edge[1])
@@ -139,6 +247,9 @@ def print_networkx_graph(G: nx.Graph, labels: dict):
     Returns:
         Displays the passed graph.
     """
+    import matplotlib.pyplot as plt
+    import networkx as nx
+
     options = {"node_size": 1000, "node_color": "blue", "with_labels": True, "font_weight":'bold'}
     pos = nx.spring_layout(G)
 
@@ -159,8 +270,11 @@ def compute_network_path(graph: nx.Graph, sender: str, receiver: str) -> list[tu
     Returns:
         list[tuple]: edge list, of the shortest path.
     """
-    paths = list(nx.shortest_simple_paths(graph, sender, receiver))
-    shortest_path = paths[0]
+    import networkx as nx
+
+    # Only the first path is needed, so don't enumerate all the simple paths (exponentially many). For
+    # repeated queries on large networks, use `network_routing.RoutingTable`, which caches them per sender.
+    shortest_path = nx.shortest_path(graph, sender, receiver)
 
     return [
         (node, shortest_path[i + 1])
@@ -203,3 +317,62 @@ def create_secure_quantum_teleportation_path_circuit(init_gate: tuple, edges: li
     teleport_network_circuit.add(gates.M(len(edges)*2))
 
     return teleport_network_circuit
+
+
+def simulate_teleportation_path_hop_by_hop(init_gate: tuple, edges: list[tuple], shots: int, seed: int = None, keep_hops_samples: bool = False) -> np.ndarray:
+    """Simulates the secure quantum teleportation network for a concrete path, one hop at a time.
+
+    Instead of building the full `1+2*len(edges)` qubits circuit, each hop only simulates the teleported qubit
+    and its Bell pair (3 qubits). The two qubits consumed by the hop are measured and discarded, and the
+    corrections are applied right away with classical feed-forward, instead of the deferred CZ/CNOT gates at
+    the end of the circuit. So memory does not grow with the number of hops, and the samples follow the same
+    statistics as the ones of `create_secure_quantum_teleportation_path_circuit`.
+
+    Args:
+        init_gate (tuple): theta, phi of the initial random gate.
+        edges (list[tuple]): List of tuples containing the edges of the graph, starting by the emmiter, and ending in the receiver.
+        shots (int): Number of shots.
+        seed (int): seed of the random generator, to get reproducible samples.
+        keep_hops_samples (bool): whether to also return the mid-circuit measurements of every hop, which the full circuit does not measure.
+
+    Returns:
+        np.ndarray: binary samples of the receiver with shape (shots, 1), like the full circuit. With `keep_hops_samples`,
+            the two measurements of each hop come first, in hop order, for a shape (shots, 2*len(edges)+1).
+    """
+    rng = np.random.default_rng(seed)
+
+    # Alice's state, given by the initial gate, repeated for every shot:
+    alpha, beta, _, _ = get_states_amplitudes(*init_gate)
+    state = np.tile(np.array([alpha, beta]), (shots, 1))
+
+    bell_pair = np.array([[1, 0], [0, 1]]) / np.sqrt(2)
+    hadamard = np.array([[1, 1], [1, -1]]) / np.sqrt(2)
+    hops_samples = np.empty((shots, 2*len(edges)), dtype=np.int64) if keep_hops_samples else None
+
+    for i in range(len(edges)):
+        # Teleported qubit (c), and Bell pair (a, b) to the next node, with shape (shots, c, a, b):
+        hop_state = state[:, :, None, None] * bell_pair[None, None, :, :]
+
+        # CNOT(c, a) and H(c):
+        hop_state[:, 1] = hop_state[:, 1, ::-1]
+        hop_state = np.einsum("ij,sjab->siab", hadamard, hop_state)
+
+        # Measure c and a, and collapse b:
+        probabilities = np.sum(np.abs(hop_state)**2, axis=-1).reshape(shots, 4)
+        outcomes = (rng.random((shots, 1)) > np.cumsum(probabilities, axis=1)).sum(axis=1).clip(max=3)
+        m_c, m_a = outcomes // 2, outcomes % 2
+        state = hop_state.reshape(shots, 4, 2)[np.arange(shots), outcomes]
+        state /= np.linalg.norm(state, axis=1, keepdims=True)
+
+        # Feed-forward corrections, X if a was 1 and Z if c was 1:
+        state[m_a == 1] = state[m_a == 1, ::-1]
+        state[m_c == 1, 1] *= -1
+
+        if keep_hops_samples:
+            hops_samples[:, 2*i], hops_samples[:, 2*i+1] = m_c, m_a
+
+    receiver_samples = (rng.random(shots) < np.abs(state[:, 1])**2).astype(np.int64)[:, None]
+
+    if keep_hops_samples:
+        return np.concatenate([hops_samples, receiver_samples], axis=1)
+    return receiver_samples
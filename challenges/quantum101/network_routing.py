@@ -0,0 +1,127 @@
+"""Network routing file.
+
+This module contains a routing table to compute paths in large quantum networks.
+"""
+from itertools import islice
+from typing import Iterator
+
+import networkx as nx
+
+
+class RoutingTable:
+    """Routing table of a network, with the shortest paths computed lazily and cached per source node.
+
+    The first query from a node runs a single BFS (or Dijkstra, if the edges are weighted) from it, and every
+    later query from that node is a lookup. When edges are added or removed through the table, only the cached
+    sources whose shortest paths can change are invalidated.
+
+    Args:
+        graph (nx.Graph): graph of the network, for example the output of `create_networkx_graph`.
+        weight (str): name of the edge attribute with the edge lengths. If None, every edge counts as one hop.
+    """
+
+    def __init__(self, graph: nx.Graph, weight: str = None):
+        self.graph = graph
+        self.weight = weight
+        self._distances: dict = {}
+        self._paths: dict = {}
+
+    def _routes_from(self, source) -> tuple[dict, dict]:
+        """Returns the cached distances and shortest paths from a source, computing them if needed."""
+        if source not in self._paths:
+            if self.weight is None:
+                self._paths[source] = nx.single_source_shortest_path(self.graph, source)
+                self._distances[source] = {node: len(path) - 1 for node, path in self._paths[source].items()}
+            else:
+                self._distances[source], self._paths[source] = nx.single_source_dijkstra(self.graph, source, weight=self.weight)
+        return self._distances[source], self._paths[source]
+
+    def shortest_path(self, sender, receiver) -> list:
+        """Returns the shortest path between two nodes.
+
+        Args:
+            sender: node of the graph to start the path from.
+            receiver: node of the graph to end the path.
+
+        Returns:
+            list: nodes of the shortest path, starting by the sender and ending in the receiver.
+        """
+        _, paths = self._routes_from(sender)
+        if receiver not in paths:
+            raise nx.NetworkXNoPath(f"No path between {sender} and {receiver}.")
+        return paths[receiver]
+
+    def distance(self, sender, receiver) -> float:
+        """Returns the length of the shortest path between two nodes."""
+        self.shortest_path(sender, receiver)
+        return self._distances[sender][receiver]
+
+    def network_path(self, sender, receiver) -> list[tuple]:
+        """Returns the shortest path between two nodes as an edge list, like `compute_network_path`."""
+        path = self.shortest_path(sender, receiver)
+        return list(zip(path[:-1], path[1:]))
+
+    def k_shortest_paths(self, sender, receiver, k: int = None) -> Iterator[list]:
+        """Generates the simple paths between two nodes, from shortest to longest.
+
+        The paths are generated lazily, so only the ones consumed are computed.
+
+        Args:
+            sender: node of the graph to start the paths from.
+            receiver: node of the graph to end the paths.
+            k (int): maximum number of paths to generate. If None, all the simple paths are generated.
+
+        Returns:
+            Iterator[list]: nodes of each path, starting by the sender and ending in the receiver.
+        """
+        paths = nx.shortest_simple_paths(self.graph, sender, receiver, weight=self.weight)
+        return paths if k is None else islice(paths, k)
+
+    def add_edge(self, node_1, node_2, **attributes):
+        """Adds an edge to the network, invalidating only the sources whose shortest paths can get shorter.
+
+        Args:
+            node_1: first node of the edge.
+            node_2: second node of the edge.
+            attributes: attributes of the edge, like its weight.
+        """
+        if self.graph.has_edge(node_1, node_2):
+            self.remove_edge(node_1, node_2)
+        self.graph.add_edge(node_1, node_2, **attributes)
+        length = attributes.get(self.weight, 1) if self.weight is not None else 1
+
+        for source in list(self._paths):
+            distances = self._distances[source]
+            distance_1, distance_2 = distances.get(node_1), distances.get(node_2)
+            if distance_1 is None and distance_2 is None:
+                continue
+            if distance_1 is None or distance_2 is None or abs(distance_1 - distance_2) > length:
+                self._invalidate(source)
+
+    def remove_edge(self, node_1, node_2):
+        """Removes an edge from the network, invalidating only the sources whose shortest paths used it.
+
+        Args:
+            node_1: first node of the edge.
+            node_2: second node of the edge.
+        """
+        self.graph.remove_edge(node_1, node_2)
+
+        for source in list(self._paths):
+            paths = self._paths[source]
+            if (
+                node_2 in paths and len(paths[node_2]) > 1 and paths[node_2][-2] == node_1
+            ) or (
+                node_1 in paths and len(paths[node_1]) > 1 and paths[node_1][-2] == node_2
+            ):
+                self._invalidate(source)
+
+    def _invalidate(self, source):
+        """Removes the cached routes from a source."""
+        del self._paths[source]
+        del self._distances[source]
+
+    def clear(self):
+        """Removes all the cached routes."""
+        self._paths.clear()
+        self._distances.clear()
@@ -1,9 +1,16 @@
 # Define the vector that contains the pauli opeations
+import sys
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 import qibo
 from ansatz import build_hardware_efficient_ansatz
 from model_params import LAMBDA_1, LAMBDA_2, LAMBDA_3, NLAYERS, NSHOTS, NUM_ASSETS, SIGMA_TARGET, TWO_QUBIT_GATES, K, N
-from utils import string_to_int_list
+
+# Shot aggregation shared by the challenge folders, see shared/shot_counts.py at the root of the repo:
+sys.path.append(str(Path(__file__).resolve().parents[3] / "shared"))
+from shot_counts import ShotCounts  # noqa: E402
 
 # All this functions should help you build the cost function of the problem, which is the expected value of the Hamiltonian defined in (7).
 
@@ -106,6 +113,43 @@ def compute_cost_function(dataset: pd.DataFrame, bit_string: list[int]) -> float
     return cost_function
 
 
+### batched costs, of all the measured portfolios at once
+
+
+def asset_weights(bit_strings: np.ndarray, k: int = K) -> np.ndarray:
+    """Value of A(i, bit_string) for every asset and every portfolio at once.
+
+    Args:
+        bit_strings (np.ndarray): bit strings that encode the portfolios, with shape (n_portfolios, N)
+        k (int, optional): qubits per asset. Defaults to K.
+
+    Returns:
+        np.ndarray: A(i, bit_string) with shape (n_portfolios, NUM_ASSETS)
+    """
+    bits = np.asarray(bit_strings, dtype=float).reshape(len(bit_strings), -1, k)
+    return ((1 - bits) / 2) @ (2.0 ** (np.arange(k) - 2))
+
+def return_costs(dataset: pd.DataFrame, weights: np.ndarray) -> np.ndarray:
+    """`return_cost_function` of every portfolio, from their `asset_weights`."""
+    return -(weights @ dataset.values.sum(axis=0))
+
+def risk_costs(dataset: pd.DataFrame, weights: np.ndarray) -> np.ndarray:
+    """`risk_cost_function` of every portfolio, from their `asset_weights`."""
+    covariance = dataset.cov().values
+    tilde_sigmas = 2 * np.triu(covariance, 1) + np.diag(np.diag(covariance))
+    h2 = (weights ** 2) @ tilde_sigmas.sum(axis=1) - NUM_ASSETS ** 2 * SIGMA_TARGET ** 2
+    return h2 ** 2
+
+def normalization_costs(weights: np.ndarray) -> np.ndarray:
+    """`normalization_cost_function` of every portfolio, from their `asset_weights`."""
+    return (weights.sum(axis=1) + 1) ** 2
+
+def cost_functions(dataset: pd.DataFrame, bit_strings: np.ndarray) -> np.ndarray:
+    """`compute_cost_function` of every portfolio, from their bit strings with shape (n_portfolios, N)."""
+    weights = asset_weights(bit_strings)
+    return LAMBDA_1 * return_costs(dataset, weights) + LAMBDA_2 * risk_costs(dataset, weights) + LAMBDA_3 * normalization_costs(weights)
+
+
 ### energy
 
 
@@ -120,10 +164,8 @@ def compute_return_energy(result: qibo.result.CircuitResult, dataset: pd.DataFra
     Returns:
         float: energy
     """
-    return_energy = 0
-    for bit_string, stat_freq in result.frequencies().items():
-        return_energy += (stat_freq / nshots) * return_cost_function(dataset,string_to_int_list(bit_string))
-    return return_energy
+    counts = ShotCounts.from_result(result)
+    return float((counts.counts / nshots) @ return_costs(dataset, asset_weights(counts.bits())))
 
 def compute_risk_energy(result: qibo.result.CircuitResult, dataset: pd.DataFrame, nshots: int = NSHOTS) -> float: 
     """Calls the risk cost functions and weights to contribution of every bistring to the energy of the second term of the hamiltonian in (7). 
@@ -136,10 +178,8 @@ def compute_risk_energy(result: qibo.result.CircuitResult, dataset: pd.DataFrame
     Returns:
         float: energy
     """
-    risk_energy = 0
-    for bit_string, stat_freq in result.frequencies().items():
-        risk_energy += (stat_freq / nshots) * risk_cost_function(dataset,string_to_int_list(bit_string))
-    return risk_energy
+    counts = ShotCounts.from_result(result)
+    return float((counts.counts / nshots) @ risk_costs(dataset, asset_weights(counts.bits())))
 
 def compute_normalization_energy(result: qibo.result.CircuitResult, nshots: int = NSHOTS) -> float: 
     """Calls the normalization cost functions and weights to contribution of every bistring to the energy of the third term of the hamiltonian in (7). 
@@ -152,10 +192,8 @@ def compute_normalization_energy(result: qibo.result.CircuitResult, nshots: int
     Returns:
         float: energy
     """
-    norm_energy = 0
-    for bit_string, stat_freq in result.frequencies().items():
-        norm_energy += (stat_freq / nshots) * normalization_cost_function(string_to_int_list(bit_string))
-    return norm_energy
+    counts = ShotCounts.from_result(result)
+    return float((counts.counts / nshots) @ normalization_costs(asset_weights(counts.bits())))
     
 def compute_total_energy(parameters: list[float], circuit, dataset: pd.DataFrame, nshots = NSHOTS, num_qubits = N) -> float:
     """Aggregates the the energies of all the terms. This is the loss function and the parametrs are the ones optimized. First, use Circuit.set_parameters(parameters) to load the new set of parameters to the ansatz at every iteration of the optimization process. Second, measure the circuit and forward to result to energy functions. 
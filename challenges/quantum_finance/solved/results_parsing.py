@@ -1,5 +1,5 @@
 import pandas as pd
-from cost_function import compute_cost_function
+from cost_function import ShotCounts, cost_functions
 from model_params import (
     LAMBDA_1,
     LAMBDA_2,
@@ -16,7 +16,6 @@ from model_params import (
 )
 from qibo.models import Circuit
 from qibo.result import CircuitResult
-from utils import string_to_int_list
 
 
 def get_minimum_energy(portfolios: dict) -> float:
@@ -26,9 +25,7 @@ def get_minimum_energy(portfolios: dict) -> float:
     return min(energies)
 
 def get_max_prob(result: CircuitResult, nshots: int = NSHOTS) -> float:
-    number_of_times = result.frequencies().values()
-    probs = [freq/nshots for freq in number_of_times]
-    return max(probs)
+    return float(ShotCounts.from_result(result).counts.max() / nshots)
 
 def get_optimal_binary_portfolios_prob_and_energy(ansatz: Circuit, dataset: pd.DataFrame, nshots: int = NSHOTS, tolerance: int = TOLERANCE) -> dict:
     """Returns the portfolios that turned out to have a certain probability. The threshold is defined as `1-docstring_probability < TOLERANCE`. It is suggested to call get_max_prob() and compute_cost_function().
@@ -42,11 +39,13 @@ def get_optimal_binary_portfolios_prob_and_energy(ansatz: Circuit, dataset: pd.D
     Returns:
         dict: _description_
     """
-    result = ansatz(nshots=nshots)
+    counts = ShotCounts.from_result(ansatz(nshots=nshots))
+    stat_freqs = counts.counts / nshots
+    optimal = (stat_freqs.max() - stat_freqs) < tolerance
+    energies = cost_functions(dataset, counts.bits()[optimal])
     optimal_portfolios = {}
-    for bit_string, stat_freq in result.frequencies().items():
-        if (get_max_prob(result) - stat_freq/nshots) < tolerance:
-            optimal_portfolios[bit_string] = {'stat_freq': stat_freq/nshots, 'energy': compute_cost_function(dataset, string_to_int_list(bit_string))}
+    for code, stat_freq, energy in zip(counts.codes[optimal], stat_freqs[optimal], energies):
+        optimal_portfolios[format(int(code), f"0{counts.nbits}b")] = {'stat_freq': float(stat_freq), 'energy': float(energy)}
     return optimal_portfolios
 
 def get_binary_portfolio(assets: list, ordered_bitstring, num_qubit_per_asset = K) -> dict:
@@ -0,0 +1,175 @@
+"""Aggregation of measurement shots into packed outcome counts.
+
+Each shot is packed into a uint64 code, with the first measured qubit as the most significant bit, like the keys
+of `result.frequencies(binary=False)`. Only the distinct codes and their counts are kept, so the probabilities,
+marginals and bit arrays of the outcomes are computed without a string per shot or per outcome, and the shots of
+several executions can be merged batch by batch.
+
+It lives in the `shared` folder at the root of the repo, which the challenge folders that use it add to their path.
+"""
+import numpy as np
+
+# Shots packed at once, to bound the temporary memory of very large sample arrays:
+CHUNK_SHOTS = 2**16
+# Up to this number of bits, the codes are counted with a dense bincount instead of sorting them:
+DENSE_BITS = 20
+
+
+def pack_samples(samples) -> np.ndarray:
+    """Packs binary samples into one integer per shot.
+
+    Args:
+        samples (np.ndarray): binary samples, with shape (shots, nbits), as given by `result.samples()`.
+
+    Returns:
+        np.ndarray: uint64 code of each shot, with the first bit as the most significant one.
+    """
+    samples = np.asarray(samples)
+    if samples.ndim != 2 or samples.shape[1] > 64:
+        raise ValueError(f"Expected samples with shape (shots, nbits) and at most 64 bits, got {samples.shape}.")
+    nbits = samples.shape[1]
+    nbytes = -(-nbits // 8)
+
+    codes = np.empty(len(samples), dtype=np.uint64)
+    buffer = np.zeros((min(len(samples), CHUNK_SHOTS), 8), dtype=np.uint8)
+    for start in range(0, len(samples), CHUNK_SHOTS):
+        chunk = samples[start : start + CHUNK_SHOTS]
+        # packbits fills the bytes from their most significant bit, so the last byte is padded with zeros:
+        buffer[: len(chunk), 8 - nbytes :] = np.packbits(chunk != 0, axis=1)
+        words = buffer[: len(chunk)].view(">u8").ravel()
+        codes[start : start + len(chunk)] = words >> np.uint64(8 * nbytes - nbits)
+    return codes
+
+
+def unpack_codes(codes, nbits: int) -> np.ndarray:
+    """Unpacks integer codes into their bits, the inverse of `pack_samples`.
+
+    Args:
+        codes (np.ndarray): code of each outcome.
+        nbits (int): number of bits of the codes.
+
+    Returns:
+        np.ndarray: uint8 bits with shape (len(codes), nbits), the most significant one first.
+    """
+    shifts = np.arange(nbits - 1, -1, -1, dtype=np.uint64)
+    return ((np.asarray(codes, dtype=np.uint64)[:, None] >> shifts) & np.uint64(1)).astype(np.uint8)
+
+
+def _aggregate(codes: np.ndarray, counts, nbits: int) -> tuple[np.ndarray, np.ndarray]:
+    """Sorted distinct codes and their total counts (each code counts once if counts is None)."""
+    if nbits <= DENSE_BITS:
+        totals = np.bincount(codes.view(np.int64), weights=counts, minlength=2**nbits)
+        distinct = np.flatnonzero(totals)
+        return distinct.astype(np.uint64), totals[distinct].astype(np.int64)
+    if counts is None:
+        distinct, totals = np.unique(codes, return_counts=True)
+        return distinct, totals.astype(np.int64)
+    distinct, inverse = np.unique(codes, return_inverse=True)
+    return distinct, np.bincount(inverse, weights=counts, minlength=len(distinct)).astype(np.int64)
+
+
+class ShotCounts:
+    """Counts of the measured outcomes, as sorted packed codes and the number of times each one was measured.
+
+    Args:
+        codes (np.ndarray): code of each outcome, see `pack_samples`. They may repeat, the counts are added.
+        counts (np.ndarray): number of times each code was measured. If None, each code is one shot.
+        nbits (int): number of measured bits.
+    """
+
+    def __init__(self, codes, counts=None, nbits: int = 64):
+        if not 0 <= nbits <= 64:
+            raise ValueError(f"The outcomes must have between 0 and 64 bits, got {nbits}.")
+        codes = np.asarray(codes, dtype=np.uint64).ravel()
+        counts = None if counts is None else np.asarray(counts, dtype=float).ravel()
+        self.nbits = nbits
+        self.codes, self.counts = _aggregate(codes, counts, nbits)
+
+    @classmethod
+    def from_samples(cls, samples) -> "ShotCounts":
+        """Counts binary samples, with shape (shots, nbits), as given by `result.samples()`."""
+        samples = np.asarray(samples)
+        return cls(pack_samples(samples), nbits=samples.shape[1])
+
+    @classmethod
+    def from_result(cls, result) -> "ShotCounts":
+        """Counts the shots of a qibo measurement result.
+
+        If the result already holds its samples, they are packed directly. Otherwise, the decimal frequencies
+        that qibo draws without generating the individual shots are used, so no sample array is ever created.
+        """
+        nbits = len(result.measurement_gate.qubits)
+        if result.has_samples():
+            return cls(pack_samples(result.samples()), nbits=nbits)
+        frequencies = result.frequencies(binary=False)
+        codes = np.fromiter(frequencies.keys(), dtype=np.uint64, count=len(frequencies))
+        counts = np.fromiter(frequencies.values(), dtype=float, count=len(frequencies))
+        return cls(codes, counts, nbits=nbits)
+
+    @classmethod
+    def from_frequencies(cls, frequencies: dict) -> "ShotCounts":
+        """Counts a frequency table with bitstring keys, like `result.frequencies()`."""
+        if not frequencies:
+            raise ValueError("Can not count an empty frequency table.")
+        nbits = len(next(iter(frequencies)))
+        characters = np.frombuffer("".join(frequencies).encode(), dtype=np.uint8)
+        bits = (characters - ord("0")).reshape(len(frequencies), nbits)
+        counts = np.fromiter(frequencies.values(), dtype=float, count=len(frequencies))
+        return cls(pack_samples(bits), counts, nbits=nbits)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __repr__(self) -> str:
+        return f"ShotCounts(nbits={self.nbits}, outcomes={len(self)}, nshots={self.nshots})"
+
+    @property
+    def nshots(self) -> int:
+        """Total number of shots."""
+        return int(self.counts.sum())
+
+    def merge(self, other: "ShotCounts") -> "ShotCounts":
+        """Counts of the shots of both results, e.g. of two batches of executions of the same circuit."""
+        if other.nbits != self.nbits:
+            raise ValueError(f"Can not merge counts of {self.nbits} and {other.nbits} bits.")
+        codes = np.concatenate([self.codes, other.codes])
+        counts = np.concatenate([self.counts, other.counts])
+        return ShotCounts(codes, counts, nbits=self.nbits)
+
+    __add__ = merge
+
+    def update(self, samples) -> "ShotCounts":
+        """Adds a new batch of binary samples to the counts, in place."""
+        merged = self.merge(ShotCounts.from_samples(samples))
+        self.codes, self.counts = merged.codes, merged.counts
+        return self
+
+    def probabilities(self) -> np.ndarray:
+        """Measured frequency of each outcome, normalized to 1."""
+        return self.counts / self.counts.sum()
+
+    def bits(self) -> np.ndarray:
+        """Bits of each outcome, with shape (n_outcomes, nbits)."""
+        return unpack_codes(self.codes, self.nbits)
+
+    def marginal(self, qubits) -> "ShotCounts":
+        """Counts of only some of the measured bits, in the given order.
+
+        Args:
+            qubits (list[int]): positions of the kept bits among the measured ones.
+
+        Returns:
+            ShotCounts: counts of the outcomes of the kept bits.
+        """
+        codes = np.zeros(len(self), dtype=np.uint64)
+        for q in qubits:
+            if not 0 <= q < self.nbits:
+                raise ValueError(f"Bit {q} is not one of the {self.nbits} measured bits.")
+            codes = (codes << np.uint64(1)) | ((self.codes >> np.uint64(self.nbits - 1 - q)) & np.uint64(1))
+        return ShotCounts(codes, self.counts, nbits=len(qubits))
+
+    def to_frequencies(self, binary: bool = True) -> dict:
+        """Frequency table of the outcomes, with bitstring keys like `result.frequencies()`, or integer ones."""
+        if binary:
+            return {format(int(code), f"0{self.nbits}b"): int(count) for code, count in zip(self.codes, self.counts)}
+        return {int(code): int(count) for code, count in zip(self.codes, self.counts)}
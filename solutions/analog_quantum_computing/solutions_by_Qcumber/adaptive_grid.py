@@ -0,0 +1,114 @@
+"""Adaptive sampling of the spectrum of flux qubits over (phi_x, phi_z).
+
+The flux rectangle is split in coarse cells, which are refined quadtree style only where the gap dE is
+curved, and the sampled spectrum is interpolated onto the regular grid that the sweeps of the notebook use.
+"""
+from collections import deque
+
+import numpy as np
+from scipy.sparse.linalg import eigsh
+
+from spectrum import Spectrum
+
+
+def _quadratic_weights(t: np.ndarray) -> np.ndarray:
+    """Lagrange weights of the nodes 0, 1/2 and 1 at the positions t, with shape (len(t), 3)."""
+    return np.stack([2 * (t - 0.5) * (t - 1), -4 * t * (t - 1), 2 * t * (t - 0.5)], axis=-1)
+
+
+def adaptive_spectrum(
+    qubit,
+    phis_x: np.ndarray,
+    phis_z: np.ndarray,
+    k: int = 2,
+    coarse: tuple[int, int] = (9, 9),
+    max_depth: int = 4,
+    tol: float = 0.1,
+) -> tuple[Spectrum, np.ndarray]:
+    """Lowest energies of a qubit on a regular (phi_x, phi_z) grid, from an adaptively refined sampling.
+
+    Every cell is sampled on a 3 x 3 stencil: its corners, edge midpoints and center. The largest difference
+    between the gap at the midpoints and the bilinear interpolation of the corners measures the local
+    curvature of the gap, and the cells where it is above the threshold are split in four, up to `max_depth`
+    times, so the samples concentrate around the degeneracy points. The samples lie on a lattice of the finest
+    cells, so neighbouring cells share them and each point is solved once. The energies are then interpolated
+    onto the output grid biquadratically from the stencil of the final cell of each point.
+
+    Args:
+        qubit: qubit with a `get_h(phi_x, phi_z)` method, like `cas.CSFQ`.
+        phis_x (np.ndarray): fluxes of the x loop of the output grid, increasing.
+        phis_z (np.ndarray): fluxes of the z loop of the output grid, increasing.
+        k (int, optional): number of levels.
+        coarse (tuple[int, int], optional): number of points of the initial grid along phi_x and phi_z.
+        max_depth (int, optional): maximum number of times a coarse cell is split.
+        tol (float, optional): curvature threshold, relative to the range of the gap on the coarse grid.
+
+    Returns:
+        tuple[Spectrum, np.ndarray]: spectrum of the output grid (without eigenvectors), and the sampled
+            (phi_x, phi_z) points, whose number is the number of `eigsh` calls.
+    """
+    phis_x, phis_z = np.asarray(phis_x, dtype=float), np.asarray(phis_z, dtype=float)
+    size = 2 ** (max_depth + 1)
+    extent = ((coarse[0] - 1) * size, (coarse[1] - 1) * size)
+    steps = ((phis_x[-1] - phis_x[0]) / extent[0], (phis_z[-1] - phis_z[0]) / extent[1])
+
+    samples: dict[tuple[int, int], np.ndarray] = {}
+    v0 = None
+
+    def energies(point):
+        nonlocal v0
+        if point not in samples:
+            phi_x, phi_z = phis_x[0] + point[0] * steps[0], phis_z[0] + point[1] * steps[1]
+            eigenvalues, eigenvectors = eigsh(qubit.get_h(phi_x, phi_z), k=k, which="SA", v0=v0)
+            samples[point] = np.sort(eigenvalues)
+            v0 = eigenvectors.sum(axis=1)
+        return samples[point]
+
+    def gap(point):
+        levels = energies(point)
+        return levels[1] - levels[0]
+
+    for a in range(coarse[0]):
+        for b in range(coarse[1]):
+            energies((a * size, b * size))
+    threshold = tol * max(np.ptp([gap(point) for point in samples]), np.finfo(float).eps)
+
+    # Cells are (x, z, size) on the lattice of the finest cells, with (x, z) their lower left corner:
+    cells = deque((a * size, b * size, size) for a in range(coarse[0] - 1) for b in range(coarse[1] - 1))
+    leaves = []
+    while cells:
+        x, z, cell_size = cells.popleft()
+        half = cell_size // 2
+        g00, g01, g10, g11 = (gap((x + dx, z + dz)) for dx in (0, cell_size) for dz in (0, cell_size))
+        bilinear = {
+            (x + half, z + half): (g00 + g10 + g01 + g11) / 4,
+            (x + half, z): (g00 + g10) / 2,
+            (x + half, z + cell_size): (g01 + g11) / 2,
+            (x, z + half): (g00 + g01) / 2,
+            (x + cell_size, z + half): (g10 + g11) / 2,
+        }
+        error = max(abs(gap(point) - estimate) for point, estimate in bilinear.items())
+        if error > threshold and half > 1:
+            cells.extend((x + dx, z + dz, half) for dx in (0, half) for dz in (0, half))
+        else:
+            leaves.append((x, z, cell_size))
+
+    grid_x = (phis_x - phis_x[0]) / steps[0]
+    grid_z = (phis_z - phis_z[0]) / steps[1]
+    interpolated = np.empty((len(phis_x), len(phis_z), k))
+    for x, z, cell_size in leaves:
+        # Output points in the cell, the last cells also take the points rounded past the edge:
+        start_x, stop_x = np.searchsorted(grid_x, [x, x + cell_size])
+        start_z, stop_z = np.searchsorted(grid_z, [z, z + cell_size])
+        rows = slice(start_x, len(phis_x) if x + cell_size == extent[0] else stop_x)
+        columns = slice(start_z, len(phis_z) if z + cell_size == extent[1] else stop_z)
+
+        half = cell_size // 2
+        stencil = np.array([[energies((x + a * half, z + b * half)) for b in range(3)] for a in range(3)])
+        weights_x = _quadratic_weights((grid_x[rows] - x) / cell_size)
+        weights_z = _quadratic_weights((grid_z[columns] - z) / cell_size)
+        interpolated[rows, columns] = np.einsum("ia,jb,abk->ijk", weights_x, weights_z, stencil)
+
+    points = np.array(list(samples), dtype=float)
+    sampled_fluxes = np.column_stack([phis_x[0] + points[:, 0] * steps[0], phis_z[0] + points[:, 1] * steps[1]])
+    return Spectrum(interpolated), sampled_fluxes
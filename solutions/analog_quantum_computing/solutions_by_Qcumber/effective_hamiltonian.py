@@ -0,0 +1,56 @@
+"""Effective qubit Hamiltonian H_eff = A sigma_x + B sigma_z (+ C sigma_y) over a whole flux grid.
+
+All the functions work on stacked arrays, with any leading grid shape, e.g. (nx, nz) for a grid of fluxes or
+(ns,) for an annealing schedule.
+"""
+import numpy as np
+
+SIG_X = np.array([[0, 1], [1, 0]])
+SIG_Y = np.array([[0, -1j], [1j, 0]])
+SIG_Z = np.array([[1, 0], [0, -1]])
+PAULIS = np.array([SIG_X, SIG_Y, SIG_Z])
+
+
+def effective_hamiltonians(energies: np.ndarray, bases: np.ndarray) -> np.ndarray:
+    """Low energy Hamiltonians in the persistent current basis, U^dagger diag(E) U at every grid point.
+
+    Args:
+        energies (np.ndarray): two lowest energies, with shape (*grid, 2).
+        bases (np.ndarray): current eigenstates in the energy basis as columns, with shape (*grid, 2, 2).
+
+    Returns:
+        np.ndarray: effective Hamiltonians, with shape (*grid, 2, 2).
+    """
+    return np.einsum("...na,...n,...nb->...ab", bases.conj(), energies, bases)
+
+
+def pauli_components(hamiltonians: np.ndarray) -> np.ndarray:
+    """Traces tr(sigma H) with sigma_x, sigma_y and sigma_z, with shape (*grid, 3)."""
+    return np.real(np.einsum("pab,...ba->...p", PAULIS, hamiltonians))
+
+
+def ising_coefficients(energies: np.ndarray, bases: np.ndarray, scale: float = 200 * np.pi) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Coefficients A, B and C of the effective Hamiltonian at every grid point, in a single batched pass.
+
+    The sigma_y component is removed with a rotation around sigma_z by the angle -atan2(a_y, a_x), which only
+    changes the phases of the current states, so the Hamiltonian becomes a transverse field Ising one.
+
+    Args:
+        energies (np.ndarray): two lowest energies, with shape (*grid, 2).
+        bases (np.ndarray): current eigenstates in the energy basis as columns, with shape (*grid, 2, 2).
+        scale (float, optional): the coefficients are divided by it, by default the conversion of the notebook.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: A (sigma_x), B (sigma_z) and C (sigma_y, zero up to
+            rounding) coefficients, each with shape grid.
+    """
+    hamiltonians = effective_hamiltonians(energies, bases)
+    components = pauli_components(hamiltonians)
+    angles = -np.arctan2(components[..., 1], components[..., 0])
+
+    # R = diag(exp(-i angle / 2), exp(i angle / 2)), and R H R^dagger scales each entry by a phase:
+    phases = np.exp(np.stack([-0.5j * angles, 0.5j * angles], axis=-1))
+    rotated = phases[..., :, None] * hamiltonians * phases[..., None, :].conj()
+
+    A, C, B = np.moveaxis(pauli_components(rotated), -1, 0) / scale
+    return A, B, C
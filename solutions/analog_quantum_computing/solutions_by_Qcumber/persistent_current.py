@@ -0,0 +1,122 @@
+"""Persistent current of flux qubits in their low energy subspace.
+
+The persistent current operator is I_p = dH/dphi_z. Its matrix elements between the lowest eigenstates are
+computed with the Hellmann-Feynman theorem, <psi_i|dH/dphi_z|psi_j>, on the eigenvectors of the spectrum
+sweep, so no eigensolver is called.
+"""
+import numpy as np
+
+from spectrum import Spectrum
+
+
+class CurrentOperator:
+    """Sparse persistent current operator dH/dphi_z of a qubit at a fixed phi_x, for any phi_z.
+
+    It is built once from three Hamiltonians around `phi_z0`, as dH/dphi_z(phi_z) = D + (phi_z - phi_z0) C,
+    with the first and second derivatives D and C taken by central differences. This is exact when the
+    Hamiltonian is at most quadratic in phi_z, like the inductive energy of the z loop of a CSFQ, and
+    `max_error` checks it for a given qubit, e.g. when phi_z also enters a Josephson term.
+
+    Args:
+        qubit: qubit with a `get_h(phi_x, phi_z)` method, like `cas.CSFQ`.
+        phi_x (float): flux of the x loop.
+        phi_z0 (float, optional): flux of the z loop around which the derivatives are taken.
+        dphi (float, optional): step of the central differences.
+    """
+
+    def __init__(self, qubit, phi_x: float, phi_z0: float = 0.0, dphi: float = 1e-3):
+        self.qubit, self.phi_x, self.phi_z0 = qubit, phi_x, phi_z0
+        H_m, H_0, H_p = (qubit.get_h(phi_x, phi_z0 + step) for step in (-dphi, 0.0, dphi))
+        self.slope = ((H_p - H_m) / (2 * dphi)).tocsr()
+        self.curvature = ((H_p - 2 * H_0 + H_m) / dphi**2).tocsr()
+        self.curvature.eliminate_zeros()
+
+    def __call__(self, phi_z: float):
+        """Sparse dH/dphi_z at a flux of the z loop."""
+        return self.slope + (phi_z - self.phi_z0) * self.curvature
+
+    def matrices(self, phis_z: np.ndarray, states: np.ndarray) -> np.ndarray:
+        """Matrix elements <psi_i|dH/dphi_z|psi_j> along a row of the grid.
+
+        The states of all the points are multiplied by D and C in two sparse products, instead of building
+        the operator at every point.
+
+        Args:
+            phis_z (np.ndarray): fluxes of the z loop, with shape (nz,).
+            states (np.ndarray): eigenvectors as columns at each flux, with shape (nz, dim, k).
+
+        Returns:
+            np.ndarray: current matrices, with shape (nz, k, k).
+        """
+        nz, dim, k = states.shape
+        columns = states.transpose(1, 0, 2).reshape(dim, nz * k)
+        slope = (self.slope @ columns).reshape(dim, nz, k).transpose(1, 0, 2)
+        curvature = (self.curvature @ columns).reshape(dim, nz, k).transpose(1, 0, 2)
+        shifts = (np.asarray(phis_z) - self.phi_z0)[:, None, None]
+        return np.einsum("zdi,zdj->zij", states.conj(), slope + shifts * curvature)
+
+    def max_error(self, phi_z: float, dphi: float = 1e-3) -> float:
+        """Largest entry of the difference with a fresh central difference of the Hamiltonian at phi_z."""
+        H_m, H_p = (self.qubit.get_h(self.phi_x, phi_z + step) for step in (-dphi, dphi))
+        difference = self(phi_z) - (H_p - H_m) / (2 * dphi)
+        return float(abs(difference).max())
+
+
+def finite_difference_matrices(qubit, phi_x: float, phis_z: np.ndarray, states: np.ndarray, dphi: float = 1e-3) -> np.ndarray:
+    """Matrix elements <psi_i|dH/dphi_z|psi_j> along a row, with a central difference of H at every point.
+
+    It makes no assumption on how H depends on phi_z, at the cost of two `get_h` calls per point.
+
+    Args:
+        qubit: qubit with a `get_h(phi_x, phi_z)` method, like `cas.CSFQ`.
+        phi_x (float): flux of the x loop.
+        phis_z (np.ndarray): fluxes of the z loop, with shape (nz,).
+        states (np.ndarray): eigenvectors as columns at each flux, with shape (nz, dim, k).
+        dphi (float, optional): step of the central differences.
+
+    Returns:
+        np.ndarray: current matrices, with shape (nz, k, k).
+    """
+    matrices = np.empty((len(phis_z), states.shape[2], states.shape[2]), dtype=complex)
+    for j, phi_z in enumerate(phis_z):
+        H_m, H_p = (qubit.get_h(phi_x, phi_z + step) for step in (-dphi, dphi))
+        matrices[j] = states[j].conj().T @ (((H_p - H_m) / (2 * dphi)) @ states[j])
+    return matrices
+
+
+def persistent_currents(
+    qubit,
+    spectrum: Spectrum,
+    phis_x: np.ndarray,
+    phis_z: np.ndarray,
+    dphi: float = 1e-3,
+    rtol: float = 1e-6,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Eigenvalues and eigenvectors of the persistent current operator in the low energy subspace of a grid.
+
+    Each row uses a `CurrentOperator` if its `max_error` at both ends of the row is within `rtol` of the
+    largest entry of dH/dphi_z. Otherwise H is not quadratic in phi_z, and the row falls back to
+    `finite_difference_matrices`.
+
+    Args:
+        qubit: qubit with a `get_h(phi_x, phi_z)` method, like `cas.CSFQ`.
+        spectrum (Spectrum): spectrum of the (phi_x, phi_z) grid, with its eigenvectors.
+        phis_x (np.ndarray): fluxes of the x loop, one per row.
+        phis_z (np.ndarray): fluxes of the z loop, one per column.
+        dphi (float, optional): step of the central differences.
+        rtol (float, optional): relative error of `CurrentOperator` above which a row falls back.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: ascending currents with shape (nx, nz, k), and the current eigenstates
+            in the energy basis as columns, with shape (nx, nz, k, k).
+    """
+    matrices = np.empty((len(phis_x), len(phis_z), spectrum.k, spectrum.k), dtype=complex)
+    for i, phi_x in enumerate(phis_x):
+        operator = CurrentOperator(qubit, phi_x, np.mean(phis_z), dphi)
+        scale = max(abs(operator.slope).max(), np.finfo(float).tiny)
+        error = max(operator.max_error(phis_z[0], dphi), operator.max_error(phis_z[-1], dphi))
+        if error <= rtol * scale:
+            matrices[i] = operator.matrices(phis_z, spectrum.subspace(i))
+        else:
+            matrices[i] = finite_difference_matrices(qubit, phi_x, phis_z, spectrum.subspace(i), dphi)
+    return np.linalg.eigh(matrices)
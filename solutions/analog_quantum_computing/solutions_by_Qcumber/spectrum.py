@@ -0,0 +1,111 @@
+"""Containers for the lowest eigenpairs of a qubit over a grid of fluxes."""
+import numpy as np
+
+
+def sort_eigenpairs(
+    eigenvalues: np.ndarray, eigenvectors: np.ndarray, reference: np.ndarray = None, degeneracy_tol: float = 1e-9
+) -> tuple[np.ndarray, np.ndarray]:
+    """Sorts the eigenpairs of `eigsh` by energy, and fixes their gauge to follow a reference.
+
+    Eigenvalues closer than the tolerance are kept as separate levels of a degenerate subspace. When a
+    reference is given (usually the eigenvectors of a neighbouring grid point), the eigenvectors of each
+    subspace are rotated to the basis closest to the reference, which fixes their phases and the mixing of
+    degenerate states, so the states change smoothly across the grid.
+
+    Args:
+        eigenvalues (np.ndarray): eigenvalues, in any order.
+        eigenvectors (np.ndarray): eigenvectors as columns, with shape (dim, k).
+        reference (np.ndarray, optional): eigenvectors to follow, with shape (dim, k).
+        degeneracy_tol (float, optional): relative tolerance under which two eigenvalues are degenerate.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: ascending eigenvalues, and their eigenvectors.
+    """
+    order = np.argsort(eigenvalues, kind="stable")
+    eigenvalues, eigenvectors = eigenvalues[order], eigenvectors[:, order]
+    if reference is None:
+        return eigenvalues, eigenvectors
+
+    tol = degeneracy_tol * max(1.0, np.max(np.abs(eigenvalues)))
+    bounds = [0, *(np.flatnonzero(np.diff(eigenvalues) > tol) + 1), len(eigenvalues)]
+    eigenvectors = eigenvectors.astype(np.result_type(eigenvectors, reference), copy=True)
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        # Unitary W that brings the subspace closest to the reference (orthogonal Procrustes):
+        overlaps = reference[:, start:stop].conj().T @ eigenvectors[:, start:stop]
+        U, _, Vh = np.linalg.svd(overlaps)
+        eigenvectors[:, start:stop] = eigenvectors[:, start:stop] @ (U @ Vh).conj().T
+    return eigenvalues, eigenvectors
+
+
+class Spectrum:
+    """Lowest k eigenpairs of a qubit at every point of a grid of fluxes.
+
+    The energies are stored in an array with shape (*grid, k) and the eigenvectors, if kept, in an array with
+    shape (*grid, dim, k). They can be preallocated with `Spectrum.empty` and filled point by point, or wrap
+    existing arrays, like the memory-mapped results of `sweep_spectrum`.
+
+    Args:
+        energies (np.ndarray): ascending energies, with shape (*grid, k).
+        states (np.ndarray, optional): eigenvectors as columns, with shape (*grid, dim, k).
+        degeneracy_tol (float, optional): relative tolerance under which two energies are degenerate.
+    """
+
+    def __init__(self, energies: np.ndarray, states: np.ndarray = None, degeneracy_tol: float = 1e-9):
+        self.energies = energies
+        self.states = states
+        self.degeneracy_tol = degeneracy_tol
+
+    @classmethod
+    def empty(cls, shape: tuple, k: int = 2, dim: int = None, dtype=complex, degeneracy_tol: float = 1e-9) -> "Spectrum":
+        """Preallocated spectrum of a grid, without eigenvectors if `dim` is None."""
+        shape = tuple(np.atleast_1d(shape))
+        states = None if dim is None else np.zeros((*shape, dim, k), dtype=dtype)
+        return cls(np.full((*shape, k), np.nan), states, degeneracy_tol)
+
+    @classmethod
+    def from_sweep(cls, results: dict, degeneracy_tol: float = 1e-9) -> "Spectrum":
+        """Spectrum of the results of `sweep_spectrum`, sharing their arrays."""
+        return cls(results["energies"], results.get("states"), degeneracy_tol)
+
+    @property
+    def shape(self) -> tuple:
+        """Shape of the grid."""
+        return self.energies.shape[:-1]
+
+    @property
+    def k(self) -> int:
+        """Number of levels."""
+        return self.energies.shape[-1]
+
+    def insert(self, index, eigenvalues: np.ndarray, eigenvectors: np.ndarray = None, reference=None):
+        """Stores the eigenpairs of `eigsh` at a grid point, sorted by energy.
+
+        Args:
+            index (tuple): grid point.
+            eigenvalues (np.ndarray): eigenvalues, in any order.
+            eigenvectors (np.ndarray, optional): eigenvectors as columns, with shape (dim, k).
+            reference (tuple, optional): already filled grid point whose states are followed, see `sort_eigenpairs`.
+        """
+        if eigenvectors is None:
+            self.energies[index] = np.sort(eigenvalues)
+            return
+        reference_states = None if reference is None or self.states is None else self.states[reference]
+        eigenvalues, eigenvectors = sort_eigenpairs(eigenvalues, eigenvectors, reference_states, self.degeneracy_tol)
+        self.energies[index] = eigenvalues
+        if self.states is not None:
+            self.states[index] = eigenvectors
+
+    def gap(self, lower: int = 0, upper: int = 1) -> np.ndarray:
+        """Energy difference between two levels at every grid point."""
+        return self.energies[..., upper] - self.energies[..., lower]
+
+    def degenerate(self, lower: int = 0, upper: int = 1) -> np.ndarray:
+        """Mask of the grid points where two levels are degenerate within the tolerance."""
+        scale = np.maximum(1.0, np.max(np.abs(self.energies), axis=-1))
+        return np.abs(self.gap(lower, upper)) <= self.degeneracy_tol * scale
+
+    def subspace(self, index) -> np.ndarray:
+        """Eigenvectors at a grid point, with shape (dim, k)."""
+        if self.states is None:
+            raise ValueError("The spectrum does not keep the eigenvectors.")
+        return self.states[index]
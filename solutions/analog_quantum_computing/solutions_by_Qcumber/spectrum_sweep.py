@@ -0,0 +1,156 @@
+"""Spectrum sweeps of flux qubits over (phi_x, phi_z) grids.
+
+The qubit can be any object with a `get_h(phi_x, phi_z)` method that returns its sparse Hamiltonian, like the
+`cas.CSFQ` qubits of the solution notebook.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+from scipy.sparse.linalg import eigsh
+
+from spectrum import sort_eigenpairs
+
+
+def solve_row(qubit, phi_x: float, phis_z: np.ndarray, k: int = 2, degeneracy_tol: float = 1e-9) -> tuple[np.ndarray, np.ndarray]:
+    """Lowest eigenpairs of the qubit along a row of the grid, with fixed phi_x.
+
+    The eigenpairs change smoothly with the flux, so every `eigsh` call starts from the sum of the eigenvectors
+    of the previous point of the row, which already has a large overlap with the wanted subspace and saves
+    most of the Lanczos iterations of a random start. The eigenvectors also follow the previous point in the
+    gauge of each (possibly degenerate) level, see `sort_eigenpairs`.
+
+    Args:
+        qubit: qubit with a `get_h(phi_x, phi_z)` method.
+        phi_x (float): flux of the x loop.
+        phis_z (np.ndarray): fluxes of the z loop.
+        k (int, optional): number of eigenpairs.
+        degeneracy_tol (float, optional): relative tolerance under which two energies are degenerate.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: ascending energies with shape (nz, k), and eigenvectors with shape (nz, dim, k).
+    """
+    energies, states = [], []
+    v0, reference = None, None
+    for phi_z in phis_z:
+        eigenvalues, eigenvectors = eigsh(qubit.get_h(phi_x, phi_z), k=k, which="SA", v0=v0)
+        eigenvalues, reference = sort_eigenpairs(eigenvalues, eigenvectors, reference, degeneracy_tol)
+        energies.append(eigenvalues)
+        states.append(reference)
+        v0 = reference.sum(axis=1)
+    return np.array(energies), np.array(states)
+
+
+def _solve_row_job(qubit, i: int, phi_x: float, phis_z: np.ndarray, k: int, degeneracy_tol: float) -> tuple[int, np.ndarray, np.ndarray]:
+    """Solves a row in a worker process, returning its index with the results."""
+    return (i, *solve_row(qubit, phi_x, phis_z, k, degeneracy_tol))
+
+
+def _open_arrays(directory, phis_x, phis_z, k, dim, dtype, store_states):
+    """Memory-mapped result arrays of a sweep, reopening the ones of a previous run with the same grid."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    grid_path = directory / "grid.npz"
+    shapes = {
+        "energies": ((len(phis_x), len(phis_z), k), np.float64),
+        "done": ((len(phis_x),), np.bool_),
+    }
+    if store_states:
+        shapes["states"] = ((len(phis_x), len(phis_z), dim, k), dtype)
+
+    paths = {name: directory / f"{name}.npy" for name in shapes}
+    resume = grid_path.exists() and all(path.exists() for path in paths.values())
+    if resume:
+        grid = np.load(grid_path)
+        if not (np.array_equal(grid["phis_x"], phis_x) and np.array_equal(grid["phis_z"], phis_z) and grid["k"] == k):
+            raise ValueError(f"{directory} has a sweep of a different grid.")
+        return {name: np.lib.format.open_memmap(path, mode="r+") for name, path in paths.items()}
+
+    np.savez(grid_path, phis_x=phis_x, phis_z=phis_z, k=k)
+    arrays = {}
+    for name, (shape, array_dtype) in shapes.items():
+        arrays[name] = np.lib.format.open_memmap(paths[name], mode="w+", dtype=array_dtype, shape=shape)
+    return arrays
+
+
+def sweep_spectrum(
+    qubit,
+    phis_x: np.ndarray,
+    phis_z: np.ndarray,
+    k: int = 2,
+    directory: str = None,
+    store_states: bool = True,
+    max_workers: int = None,
+    progress_interval: float = 10.0,
+    degeneracy_tol: float = 1e-9,
+) -> dict[str, np.ndarray]:
+    """Lowest eigenpairs of a qubit over a (phi_x, phi_z) grid, solving the rows in a process pool.
+
+    Each row is solved with warm-started `eigsh` calls (see `solve_row`). With a directory, the results are
+    stored in memory-mapped .npy files as the rows finish, so a sweep that crashes or is interrupted continues
+    from its finished rows when called again with the same directory and grid.
+
+    Args:
+        qubit: qubit with a `get_h(phi_x, phi_z)` method. It is sent to the workers, so it must be picklable.
+        phis_x (np.ndarray): fluxes of the x loop, one per row.
+        phis_z (np.ndarray): fluxes of the z loop, one per column.
+        k (int, optional): number of eigenpairs.
+        directory (str, optional): directory of the memory-mapped results. If None, they are kept in memory.
+        store_states (bool, optional): whether to keep the eigenvectors, needed for the persistent currents.
+        max_workers (int, optional): number of worker processes. If 1, the rows are solved in this process.
+        progress_interval (float, optional): minimum number of seconds between progress messages.
+        degeneracy_tol (float, optional): relative tolerance under which two energies are degenerate.
+
+    Returns:
+        dict[str, np.ndarray]: "energies" with shape (nx, nz, k), "done" with the finished rows, and "states"
+            with shape (nx, nz, dim, k) if `store_states`. `Spectrum.from_sweep` wraps them.
+    """
+    phis_x, phis_z = np.asarray(phis_x, dtype=float), np.asarray(phis_z, dtype=float)
+    H = qubit.get_h(phis_x[0], phis_z[0])
+    dim, dtype = H.shape[0], np.result_type(H.dtype, np.float64)
+
+    if directory is None:
+        results = {
+            "energies": np.empty((len(phis_x), len(phis_z), k)),
+            "done": np.zeros(len(phis_x), dtype=bool),
+        }
+        if store_states:
+            results["states"] = np.empty((len(phis_x), len(phis_z), dim, k), dtype=dtype)
+    else:
+        results = _open_arrays(directory, phis_x, phis_z, k, dim, dtype, store_states)
+
+    pending = np.flatnonzero(~results["done"])
+    start = last_report = time.perf_counter()
+
+    def store(i, energies, states):
+        nonlocal last_report
+        results["energies"][i] = energies
+        if store_states:
+            results["states"][i] = states
+        if directory is not None:
+            results["energies"].flush()
+            if store_states:
+                results["states"].flush()
+        results["done"][i] = True
+        if directory is not None:
+            results["done"].flush()
+
+        now = time.perf_counter()
+        if now - last_report >= progress_interval:
+            finished = int(results["done"].sum())
+            solved = finished - (len(phis_x) - len(pending))
+            remaining = (now - start) / solved * (len(phis_x) - finished)
+            print(f"{finished}/{len(phis_x)} rows, {now - start:.0f} s elapsed, ~{remaining:.0f} s left", flush=True)
+            last_report = now
+
+    if max_workers == 1 or len(pending) <= 1:
+        for i in pending:
+            store(*_solve_row_job(qubit, i, phis_x[i], phis_z, k, degeneracy_tol))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_solve_row_job, qubit, i, phis_x[i], phis_z, k, degeneracy_tol) for i in pending]
+            for future in as_completed(futures):
+                store(*future.result())
+
+    return results
@@ -0,0 +1,149 @@
+import numpy as np
+
+from energies import ShotCounts
+from qubo import get_Knapsack_QUBO
+
+
+def default_beta_range(Q) -> tuple[float, float]:
+    """Inverse temperatures to anneal between, from the scale of the single-flip energy changes of the QUBO.
+
+    At the hottest temperature the biggest possible change is accepted half of the times, and at the coldest
+    one the smallest nonzero change is only accepted once every hundred times.
+
+    Args:
+        Q (np.ndarray): symmetric QUBO matrix.
+
+    Returns:
+        tuple[float, float]: initial and final inverse temperatures.
+    """
+    Q = np.asarray(Q, dtype=float)
+    biggest_change = np.max(np.abs(np.diag(Q)) + 2 * (np.abs(Q).sum(axis=1) - np.abs(np.diag(Q))))
+    nonzero = np.abs(Q[Q != 0])
+    smallest_change = nonzero.min() if nonzero.size else 1.0
+    return np.log(2) / max(biggest_change, 1e-12), np.log(100) / smallest_change
+
+
+class _Replicas:
+    """Batch of bitstrings with their local fields Qx and energies, updated one variable at a time."""
+
+    def __init__(self, Q, n_replicas, rng):
+        self.Q = Q
+        self.X = rng.integers(0, 2, size=(n_replicas, len(Q))).astype(float)
+        self.fields = self.X @ Q
+        self.energies = np.einsum("ri,ri->r", self.X, self.fields)
+
+    def sweep(self, betas, rng):
+        """Metropolis sweep over all the variables, for every replica at its own inverse temperature."""
+        diagonal = np.diag(self.Q)
+        for i in range(len(self.Q)):
+            # Flipping bit i changes the energy by 2 d (Qx)_i + Q_ii, with d = ±1:
+            d = 1 - 2 * self.X[:, i]
+            deltas = 2 * d * self.fields[:, i] + diagonal[i]
+            accept = (deltas <= 0) | (rng.random(len(d)) < np.exp(-betas * np.maximum(deltas, 0)))
+            if accept.any():
+                d = d * accept
+                self.X[:, i] += d
+                self.fields += d[:, None] * self.Q[i]
+                self.energies += deltas * accept
+
+
+def simulated_annealing(Q, sweeps: int = 200, n_replicas: int = 64, beta_range=None, seed: int = None) -> tuple[np.ndarray, np.ndarray]:
+    """Minimizes a QUBO with independent annealing replicas, vectorized over the replicas.
+
+    Args:
+        Q (np.ndarray): symmetric QUBO matrix.
+        sweeps (int, optional): number of sweeps over all the variables.
+        n_replicas (int, optional): number of independent replicas.
+        beta_range (tuple[float, float], optional): initial and final inverse temperatures, geometrically spaced.
+        seed (int, optional): seed of the random generator, the same seed always gives the same result.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: final bitstrings of the replicas with shape (n_replicas, n), and their energies.
+    """
+    Q = np.asarray(Q, dtype=float)
+    rng = np.random.default_rng(seed)
+    beta_min, beta_max = default_beta_range(Q) if beta_range is None else beta_range
+
+    replicas = _Replicas(Q, n_replicas, rng)
+    for beta in np.geomspace(beta_min, beta_max, sweeps):
+        replicas.sweep(np.full(n_replicas, beta), rng)
+    return replicas.X.astype(np.int64), replicas.energies
+
+
+def parallel_tempering(
+    Q, sweeps: int = 200, n_temperatures: int = 16, n_chains: int = 4, beta_range=None, seed: int = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """Minimizes a QUBO with parallel tempering (replica exchange), vectorized over all the replicas.
+
+    Each chain has a replica at each of the temperatures of a geometric ladder. After every sweep, the
+    replicas at neighbouring temperatures of a chain exchange their temperatures with the Metropolis
+    probability min(1, exp((beta_k - beta_k+1)(E_k - E_k+1))), which lets them escape local minima.
+
+    Args:
+        Q (np.ndarray): symmetric QUBO matrix.
+        sweeps (int, optional): number of sweeps over all the variables.
+        n_temperatures (int, optional): number of temperatures of the ladder.
+        n_chains (int, optional): number of independent chains.
+        beta_range (tuple[float, float], optional): hottest and coldest inverse temperatures.
+        seed (int, optional): seed of the random generator, the same seed always gives the same result.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: best bitstring found by each chain with shape (n_chains, n), and their energies.
+    """
+    Q = np.asarray(Q, dtype=float)
+    rng = np.random.default_rng(seed)
+    beta_min, beta_max = default_beta_range(Q) if beta_range is None else beta_range
+    ladder = np.geomspace(beta_min, beta_max, n_temperatures)
+
+    # Replica r of chain c starts at temperature r % n_temperatures; temperature_of tracks where each replica is.
+    replicas = _Replicas(Q, n_chains * n_temperatures, rng)
+    temperature_of = np.tile(np.arange(n_temperatures), (n_chains, 1))
+    chain_offsets = (np.arange(n_chains) * n_temperatures)[:, None]
+
+    best_X = replicas.X.reshape(n_chains, n_temperatures, -1)[:, 0].copy()
+    best_energies = np.full(n_chains, np.inf)
+
+    for sweep in range(sweeps):
+        replicas.sweep(ladder[temperature_of.ravel()], rng)
+
+        energies = replicas.energies.reshape(n_chains, n_temperatures)
+        chain_best = np.argmin(energies, axis=1)
+        improved = energies[np.arange(n_chains), chain_best] < best_energies
+        best_energies[improved] = energies[improved, chain_best[improved]]
+        best_X[improved] = replicas.X.reshape(n_chains, n_temperatures, -1)[improved, chain_best[improved]]
+
+        # Replica at each temperature, and exchange the even or odd neighbouring pairs alternately:
+        replica_at = np.argsort(temperature_of, axis=1)
+        for k in range(sweep % 2, n_temperatures - 1, 2):
+            r1, r2 = replica_at[:, k], replica_at[:, k + 1]
+            e1 = replicas.energies[chain_offsets[:, 0] + r1]
+            e2 = replicas.energies[chain_offsets[:, 0] + r2]
+            log_ratio = (ladder[k] - ladder[k + 1]) * (e1 - e2)
+            swap = rng.random(n_chains) < np.exp(np.minimum(log_ratio, 0))
+            chains = np.flatnonzero(swap)
+            temperature_of[chains, r1[swap]] = k + 1
+            temperature_of[chains, r2[swap]] = k
+
+    return best_X.astype(np.int64), best_energies
+
+
+def solve_annealing(v, w, W, seed, sweeps=200, n_temperatures=16, n_chains=8):
+    """Solves a knapsack instance with parallel tempering, with the solver signature of the benchmark.
+
+    The best bitstring of each chain counts as one shot, and can also be used to warm-start QAOA.
+
+    Args:
+        v (list): values of each item.
+        w (list): weights of each item.
+        W (int): maximum weight the knapsack can hold.
+        seed (int): seed of the random generator.
+        sweeps (int, optional): number of sweeps over all the variables.
+        n_temperatures (int, optional): number of temperatures of the ladder.
+        n_chains (int, optional): number of independent chains.
+
+    Returns:
+        tuple[dict, int, bool]: frequencies of the best bitstrings of the chains, number of sweeps of all the
+            replicas, and True, since the annealing always runs its fixed number of sweeps.
+    """
+    X, _ = parallel_tempering(get_Knapsack_QUBO(v, w, W), sweeps, n_temperatures, n_chains, seed=seed)
+    return ShotCounts.from_samples(X).to_frequencies(), sweeps * n_temperatures * n_chains, True
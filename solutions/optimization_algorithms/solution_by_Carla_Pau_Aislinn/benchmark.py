@@ -0,0 +1,197 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import scipy as sp
+from qibo import gates, models
+
+from annealing import solve_annealing
+from energies import ShotCounts, frequencies_energy
+from qaoa import solve_qaoa
+from qubo import get_Knapsack_QUBO, load_instances
+from reference_solvers import knapsack_optimum
+
+
+def HEA(nqubits, p, parameters):
+    """Hardware efficient ansatz of the solution, with p layers of RY rotations and a CNOT ladder."""
+    qc = models.Circuit(nqubits)
+    for k in range(p):
+        for i in range(nqubits):
+            qc.add(gates.RY(i, parameters[i, k]))
+        for i in range(nqubits - 1):
+            qc.add(gates.CNOT(i, i + 1))
+    qc.add(gates.M(*range(nqubits)))
+    return qc
+
+
+def solve_hea_vqe(v, w, W, seed, layers=5, shots=100, maxiter=200):
+    """Solves a knapsack instance with the HEA VQE of the solution.
+
+    Args:
+        v (list): values of each item.
+        w (list): weights of each item.
+        W (int): maximum weight the knapsack can hold.
+        seed (int): seed of the initial parameters and the shots.
+        layers (int, optional): layers of the ansatz.
+        shots (int, optional): shots per circuit evaluation.
+        maxiter (int, optional): maximum iterations of the optimizer.
+
+    Returns:
+        tuple[dict, int, bool]: frequencies of the final circuit, number of circuit evaluations, and whether the
+            optimizer converged before `maxiter`.
+    """
+    Q = get_Knapsack_QUBO(v, w, W)
+    nqubits = len(Q)
+    rng = np.random.default_rng(seed)
+    evaluations = 0
+
+    def run(parameters):
+        nonlocal evaluations
+        evaluations += 1
+        circuit = HEA(nqubits, layers, parameters.reshape((nqubits, layers)))
+        return ShotCounts.from_result(circuit(nshots=shots))
+
+    initial_parameters = rng.random(nqubits * layers) * 2 * np.pi
+    np.random.seed(seed)  # The qibo numpy backend samples the shots with the global generator
+    optimal = sp.optimize.minimize(
+        lambda parameters: frequencies_energy(run(parameters), Q),
+        initial_parameters,
+        method="COBYLA",
+        options={"maxiter": maxiter},
+    )
+    return run(optimal.x).to_frequencies(), evaluations, bool(optimal.success)
+
+
+# Solvers that can be benchmarked, all with signature solver(v, w, W, seed) -> (frequencies, evaluations, converged)
+SOLVERS = {"hea_vqe": solve_hea_vqe, "annealing": solve_annealing, "qaoa": solve_qaoa}
+
+
+def evaluate_frequencies(frequencies: dict, v, w, W, optimum: int) -> dict:
+    """Quality metrics of the final measurement of a solver.
+
+    The answer of the solver is its most frequent bitstring, whose value is compared to the optimum if it fits.
+
+    Args:
+        frequencies (dict): number of times each bitstring (items followed by slack bits) has been measured.
+        v (list): values of each item.
+        w (list): weights of each item.
+        W (int): maximum weight the knapsack can hold.
+        optimum (int): optimal value of the instance.
+
+    Returns:
+        dict: approximation ratio of the answer, and probability of measuring an optimal selection.
+    """
+    n = len(v)
+    characters = np.frombuffer("".join(frequencies).encode(), dtype=np.uint8)
+    items = (characters - ord("0")).reshape(len(frequencies), -1)[:, :n]
+    counts = np.fromiter(frequencies.values(), dtype=float, count=len(frequencies))
+
+    values = items @ np.asarray(v)
+    feasible = items @ np.asarray(w) <= W
+    answer = np.argmax(counts)
+    return {
+        "approximation_ratio": float(values[answer] / optimum) if feasible[answer] and optimum > 0 else 0.0,
+        "success_probability": float(counts[feasible & (values == optimum)].sum() / counts.sum()),
+    }
+
+
+def run_job(algorithm: str, instance: dict, seed: int) -> dict:
+    """Solves an instance with a seed, and measures the result against the exact optimum."""
+    v, w, W = instance["values"], instance["weights"], instance["max_w"]
+    start = time.perf_counter()
+    frequencies, evaluations, converged = SOLVERS[algorithm](v, w, W, seed)
+    wall_time = time.perf_counter() - start
+
+    record = {"algorithm": algorithm, "instance": instance["id"], "seed": seed}
+    record.update(evaluate_frequencies(frequencies, v, w, W, knapsack_optimum(v, w, W)))
+    record.update({"evaluations": evaluations, "converged": converged, "wall_time": wall_time})
+    return record
+
+
+def load_checkpoint(checkpoint: str) -> list[dict]:
+    """Loads the records of the jobs already done, one json per line."""
+    if checkpoint is None or not os.path.exists(checkpoint):
+        return []
+    with open(checkpoint, "r") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def run_benchmark(algorithm="hea_vqe", seeds=3, instance_ids=None, checkpoint=None, max_workers=None) -> list[dict]:
+    """Benchmarks an algorithm on the knapsack instances, over several seeds, in a process pool.
+
+    Every finished job is appended to the checkpoint file, and the jobs found there are not run again, so an
+    interrupted benchmark can be resumed by calling it again with the same checkpoint.
+
+    Args:
+        algorithm (str, optional): name of the solver in `SOLVERS`.
+        seeds (int, optional): number of seeds per instance.
+        instance_ids (list[int], optional): instances to solve. Defaults to all the instances.
+        checkpoint (str, optional): json lines file where to store the records.
+        max_workers (int, optional): number of worker processes.
+
+    Returns:
+        list[dict]: one record per (instance, seed), with the metrics of the job.
+    """
+    instances = load_instances()
+    if instance_ids is None:
+        instance_ids = sorted(instances)
+
+    records = [r for r in load_checkpoint(checkpoint) if r["algorithm"] == algorithm]
+    done = {(r["instance"], r["seed"]) for r in records}
+    jobs = [(i, seed) for i in instance_ids for seed in range(seeds) if (i, seed) not in done]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_job, algorithm, instances[i], seed) for i, seed in jobs]
+        for future in as_completed(futures):
+            record = future.result()
+            records.append(record)
+            if checkpoint is not None:
+                with open(checkpoint, "a") as file:
+                    file.write(json.dumps(record) + "\n")
+
+    return sorted(
+        (r for r in records if r["instance"] in instance_ids and r["seed"] < seeds),
+        key=lambda r: (r["instance"], r["seed"]),
+    )
+
+
+def summarize(records: list[dict]) -> dict[int, dict]:
+    """Averages the metrics of the records over the seeds of each instance, "converged" becomes the converged fraction."""
+    metrics = ["approximation_ratio", "success_probability", "evaluations", "converged", "wall_time"]
+    summary = {}
+    for instance in sorted({r["instance"] for r in records}):
+        instance_records = [r for r in records if r["instance"] == instance]
+        # Records of older checkpoints have no "converged" flag, and average to nan:
+        summary[instance] = {m: float(np.mean([r.get(m, np.nan) for r in instance_records])) for m in metrics}
+        summary[instance]["seeds"] = len(instance_records)
+    return summary
+
+
+def print_summary(summary: dict[int, dict]):
+    """Prints the averaged metrics of each instance as a table."""
+    print(
+        f"{'instance':>8} {'seeds':>5} {'approx ratio':>12} {'success prob':>12} {'evaluations':>11} {'converged':>9} "
+        f"{'wall time (s)':>13}"
+    )
+    for instance, s in summary.items():
+        print(
+            f"{instance:>8} {s['seeds']:>5} {s['approximation_ratio']:>12.3f} {s['success_probability']:>12.3f} "
+            f"{s['evaluations']:>11.0f} {s['converged']:>9.0%} {s['wall_time']:>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark a knapsack solver on problem_instances.json")
+    parser.add_argument("--algorithm", default="hea_vqe", choices=sorted(SOLVERS))
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--instances", type=int, nargs="*", default=None)
+    parser.add_argument("--checkpoint", default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    print_summary(
+        summarize(run_benchmark(args.algorithm, args.seeds, args.instances, args.checkpoint, args.workers))
+    )
@@ -0,0 +1,107 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Shot aggregation shared by the challenge folders, see shared/shot_counts.py at the root of the repo:
+sys.path.append(str(Path(__file__).resolve().parents[3] / "shared"))
+from shot_counts import ShotCounts  # noqa: E402
+
+
+def frequencies_to_arrays(frequencies) -> tuple[np.ndarray, np.ndarray]:
+    """Converts a frequency table, like `result.frequencies()`, into arrays.
+
+    Args:
+        frequencies (dict | ShotCounts): number of times each bitstring has been measured.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: bitstrings with shape (n_outcomes, n_bits), and their counts.
+    """
+    if isinstance(frequencies, ShotCounts):
+        return frequencies.bits(), frequencies.counts.astype(float)
+    characters = np.frombuffer("".join(frequencies).encode(), dtype=np.uint8)
+    bitstrings = (characters - ord("0")).reshape(len(frequencies), -1)
+    counts = np.fromiter(frequencies.values(), dtype=float, count=len(frequencies))
+    return bitstrings, counts
+
+
+def samples_to_arrays(samples) -> tuple[np.ndarray, np.ndarray]:
+    """Aggregates the samples of a result, like `result.samples()`, into a frequency table.
+
+    Args:
+        samples (np.ndarray): measured bitstrings, with shape (n_shots, n_bits).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: distinct bitstrings with shape (n_outcomes, n_bits), and their counts.
+    """
+    return frequencies_to_arrays(ShotCounts.from_samples(samples))
+
+
+def batch_energies(bitstrings, Q) -> np.ndarray:
+    """Energies x^T Q x of all the given bitstrings at once.
+
+    Args:
+        bitstrings (np.ndarray): bitstrings with shape (n_outcomes, n_bits).
+        Q (np.ndarray): QUBO matrix, with shape (n_bits, n_bits).
+
+    Returns:
+        np.ndarray: energy of each bitstring.
+    """
+    bitstrings = np.asarray(bitstrings, dtype=float)
+    return np.einsum("bi,ij,bj->b", bitstrings, np.asarray(Q, dtype=float), bitstrings, optimize=True)
+
+
+def expectation(energies, counts) -> float:
+    """Shot-weighted expectation of the energy.
+
+    Args:
+        energies (np.ndarray): energy of each outcome.
+        counts (np.ndarray): number of times each outcome has been measured.
+
+    Returns:
+        float: average energy over all the shots.
+    """
+    counts = np.asarray(counts, dtype=float)
+    return float(np.dot(energies, counts) / counts.sum())
+
+
+def cvar(energies, counts, alpha: float = 0.1) -> float:
+    """Conditional value at risk (CVaR-alpha) of the energy.
+
+    It is the average over only the lowest alpha fraction of the shots, which rewards states that have the
+    good solutions with some probability, instead of on average. With alpha=1 it is the `expectation`.
+
+    Args:
+        energies (np.ndarray): energy of each outcome.
+        counts (np.ndarray): number of times each outcome has been measured.
+        alpha (float, optional): fraction of the shots to average, in (0, 1].
+
+    Returns:
+        float: average energy of the best alpha fraction of the shots.
+    """
+    if not 0 < alpha <= 1:
+        raise ValueError(f"alpha must be in (0, 1], got {alpha}.")
+    order = np.argsort(energies)
+    energies = np.asarray(energies, dtype=float)[order]
+    counts = np.asarray(counts, dtype=float)[order]
+
+    # Take whole outcomes while they fit in the alpha fraction, and the needed part of the next one:
+    n_shots = alpha * counts.sum()
+    taken = np.minimum(counts, np.maximum(n_shots - (np.cumsum(counts) - counts), 0))
+    return float(np.dot(energies, taken) / n_shots)
+
+
+def frequencies_energy(frequencies, Q, alpha: float = 1.0) -> float:
+    """Energy of a measurement result, to use as cost function of the variational algorithms.
+
+    Args:
+        frequencies (dict | ShotCounts): number of times each bitstring has been measured, like
+            `result.frequencies()`, or the packed counts of `ShotCounts.from_result`.
+        Q (np.ndarray): QUBO matrix.
+        alpha (float, optional): CVaR fraction, with 1 it is the shot-weighted expectation.
+
+    Returns:
+        float: CVaR-alpha of the energy.
+    """
+    bitstrings, counts = frequencies_to_arrays(frequencies)
+    return cvar(batch_energies(bitstrings, Q), counts, alpha=alpha)
@@ -0,0 +1,134 @@
+import numpy as np
+import scipy as sp
+
+from energies import ShotCounts
+from qubo import get_Knapsack_QUBO
+
+
+def qubo_diagonal(Q) -> np.ndarray:
+    """Energies x^T Q x of all the 2**n bitstrings, in the statevector order (qubit 0 is the most significant bit).
+
+    The vector is built adding one qubit at a time as the new least significant bit, which doubles it:
+    E(x, x_k) = E(x) + x_k (Q_kk + 2 sum_{j<k} Q_kj x_j), so it costs O(2**n) per qubit.
+
+    Args:
+        Q (np.ndarray): symmetric QUBO matrix.
+
+    Returns:
+        np.ndarray: diagonal of the cost Hamiltonian, with 2**n entries.
+    """
+    Q = np.asarray(Q, dtype=float)
+    energies = np.zeros(1)
+    for k in range(len(Q)):
+        # Coupling of qubit k with all the previous ones, for every bitstring of the previous ones:
+        coupling = np.zeros(1)
+        for j in range(k):
+            coupling = np.stack([coupling, coupling + Q[k, j]], axis=-1).ravel()
+        energies = np.stack([energies, energies + Q[k, k] + 2 * coupling], axis=-1).ravel()
+    return energies
+
+
+def apply_mixer(states: np.ndarray, betas: np.ndarray, nqubits: int) -> np.ndarray:
+    """Applies exp(-i beta X) on every qubit, as a butterfly between the amplitudes with the qubit at 0 and at 1.
+
+    Args:
+        states (np.ndarray): batch of statevectors, with shape (batch, 2**nqubits). It is updated in place.
+        betas (np.ndarray): mixer angle of each state of the batch.
+        nqubits (int): number of qubits.
+
+    Returns:
+        np.ndarray: the updated states.
+    """
+    cos = np.cos(betas)[:, None, None, None]
+    isin = 1j * np.sin(betas)[:, None, None, None]
+    for q in range(nqubits):
+        view = states.reshape(len(states), 2**q, 2, 2 ** (nqubits - q - 1))
+        zero, one = view[:, :, 0:1], view[:, :, 1:2]
+        new_zero = cos * zero - isin * one
+        one *= cos
+        one -= isin * zero
+        zero[...] = new_zero
+    return states
+
+
+def qaoa_states(diagonal: np.ndarray, gammas, betas) -> np.ndarray:
+    """Final QAOA statevectors for a batch of parameters.
+
+    Each cost layer is a single elementwise phase multiply with the precomputed diagonal, and each mixer layer
+    an O(n 2**n) butterfly, so a depth p circuit costs O(p n 2**n).
+
+    Args:
+        diagonal (np.ndarray): diagonal of the cost Hamiltonian, from `qubo_diagonal`.
+        gammas (np.ndarray): cost angles, with shape (batch, p) or (p,).
+        betas (np.ndarray): mixer angles, with shape (batch, p) or (p,).
+
+    Returns:
+        np.ndarray: statevectors, with shape (batch, 2**n).
+    """
+    gammas, betas = np.atleast_2d(gammas), np.atleast_2d(betas)
+    nqubits = int(np.log2(len(diagonal)))
+
+    states = np.full((len(gammas), len(diagonal)), 2 ** (-nqubits / 2), dtype=complex)
+    for layer in range(gammas.shape[1]):
+        states *= np.exp(-1j * gammas[:, layer : layer + 1] * diagonal)
+        apply_mixer(states, betas[:, layer], nqubits)
+    return states
+
+
+def qaoa_expectations(diagonal: np.ndarray, gammas, betas) -> np.ndarray:
+    """Expected cost of the QAOA states, for a batch of parameters.
+
+    Args:
+        diagonal (np.ndarray): diagonal of the cost Hamiltonian, from `qubo_diagonal`.
+        gammas (np.ndarray): cost angles, with shape (batch, p) or (p,).
+        betas (np.ndarray): mixer angles, with shape (batch, p) or (p,).
+
+    Returns:
+        np.ndarray: expectation of each state of the batch.
+    """
+    return np.abs(qaoa_states(diagonal, gammas, betas)) ** 2 @ diagonal
+
+
+def solve_qaoa(v, w, W, seed, p=2, shots=1000, grid=16, maxiter=200, rhobeg=0.3, tol=1e-2):
+    """Solves a knapsack instance with statevector QAOA, with the solver signature of the benchmark.
+
+    The cost is normalized to [-1, 1]. The initial angles are the best point of a batched (gamma, beta) grid
+    of depth 1 repeated in every layer, and then all of them are optimized with COBYLA.
+
+    Args:
+        v (list): values of each item.
+        w (list): weights of each item.
+        W (int): maximum weight the knapsack can hold.
+        seed (int): seed of the shots of the final state.
+        p (int, optional): number of layers.
+        shots (int, optional): number of shots of the final state.
+        grid (int, optional): number of points per angle of the initial grid search.
+        maxiter (int, optional): maximum iterations of the optimizer.
+        rhobeg (float, optional): initial step of COBYLA on the angles, of the order of the grid spacing.
+        tol (float, optional): final step of COBYLA on the angles. The landscape is rugged below ~1e-2 rad, so
+            a smaller one mostly makes the optimizer run until `maxiter`.
+
+    Returns:
+        tuple[dict, int, bool]: frequencies of the final state, number of statevector evaluations, and whether
+            the optimizer converged before `maxiter`.
+    """
+    diagonal = qubo_diagonal(get_Knapsack_QUBO(v, w, W))
+    diagonal = diagonal / np.max(np.abs(diagonal))
+    nqubits = int(np.log2(len(diagonal)))
+
+    gammas, betas = np.meshgrid(np.linspace(0, 2 * np.pi, grid), np.linspace(0, np.pi / 2, grid))
+    grid_energies = qaoa_expectations(diagonal, gammas.reshape(-1, 1), betas.reshape(-1, 1))
+    best = np.argmin(grid_energies)
+    initial_parameters = np.concatenate([np.full(p, gammas.ravel()[best]), np.full(p, betas.ravel()[best])])
+
+    optimal = sp.optimize.minimize(
+        lambda parameters: qaoa_expectations(diagonal, parameters[:p], parameters[p:])[0],
+        initial_parameters,
+        method="COBYLA",
+        tol=tol,
+        options={"maxiter": maxiter, "rhobeg": rhobeg},
+    )
+
+    probabilities = np.abs(qaoa_states(diagonal, optimal.x[:p], optimal.x[p:])[0]) ** 2
+    outcomes = np.random.default_rng(seed).choice(len(diagonal), size=shots, p=probabilities / probabilities.sum())
+    return ShotCounts(outcomes, nbits=nqubits).to_frequencies(), grid**2 + optimal.nfev + 1, bool(optimal.success)
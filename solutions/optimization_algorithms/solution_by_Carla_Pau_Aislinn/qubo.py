@@ -0,0 +1,111 @@
+import json
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse as sps
+
+INSTANCES_PATH = Path(__file__).resolve().parents[3] / "challenges" / "optimization_algorithms" / "problem_instances.json"
+
+
+@lru_cache(maxsize=None)
+def load_instances(path: Path = INSTANCES_PATH) -> dict[int, dict]:
+    """Loads the knapsack instances.
+
+    Args:
+        path (Path, optional): json file with the instances. Defaults to the challenge problem_instances.json.
+
+    Returns:
+        dict[int, dict]: instances (with keys 'values', 'weights' and 'max_w') indexed by their id.
+    """
+    with open(path, "r") as json_file:
+        return {instance["id"]: instance for instance in json.load(json_file)}
+
+
+def slack_coefficients(W: int) -> np.ndarray:
+    """Coefficients of the binary encoding of the slack variable, which must be able to take any value in [0, W].
+
+    Args:
+        W (int): maximum weight the knapsack can hold.
+
+    Returns:
+        np.ndarray: 1, 2, 4, ..., 2**(s-2) and a last coefficient so that all of them add up to W.
+    """
+    s = int(np.log2(W)) + 1
+    coefficients = 2.0 ** np.arange(s)
+    coefficients[-1] = W - 2 ** (s - 1) + 1
+    return coefficients
+
+
+def get_Knapsack_QUBO_factors(v, w, W) -> tuple[float, np.ndarray, np.ndarray]:
+    """Factors of the knapsack QUBO, Q = alpha * a a^T + diag(linear).
+
+    The penalty term is rank one, so the QUBO can be stored and evaluated in O(n) as
+    x^T Q x = alpha * (a.x)**2 + linear.x, which is what large instances should use.
+
+    Args:
+        v (list): values of each item.
+        w (list): weights of each item.
+        W (int): maximum weight the knapsack can hold.
+
+    Returns:
+        tuple[float, np.ndarray, np.ndarray]: penalty alpha, vector a = (w, -slack coefficients), and diagonal (-v, 0).
+    """
+    v = np.asarray(v, dtype=float)
+    alpha = v.max() + 1
+    a = np.concatenate([np.asarray(w, dtype=float), -slack_coefficients(W)])
+    linear = np.concatenate([-v, np.zeros(len(a) - len(v))])
+    return alpha, a, linear
+
+
+def get_Knapsack_QUBO(v, w, W, sparse: bool = False):
+    """Builds the knapsack QUBO, for the items followed by the slack bits.
+
+    Args:
+        v (list): values of each item.
+        w (list): weights of each item.
+        W (int): maximum weight the knapsack can hold.
+        sparse (bool, optional): return a scipy CSR matrix. Only worth it for QUBOs with many zeros, the penalty
+            term of the knapsack is dense, see `get_Knapsack_QUBO_factors` for large instances.
+
+    Returns:
+        np.ndarray | sps.csr_matrix: symmetric QUBO matrix.
+    """
+    alpha, a, linear = get_Knapsack_QUBO_factors(v, w, W)
+    Q = alpha * np.outer(a, a)
+    Q[np.diag_indices_from(Q)] += linear
+    return sps.csr_matrix(Q) if sparse else Q
+
+
+@lru_cache(maxsize=None)
+def get_instance_QUBO(instance_id: int, sparse: bool = False, path: Path = INSTANCES_PATH):
+    """Builds the QUBO of an instance only once, and returns the cached one afterwards.
+
+    The returned matrix is shared by all the callers, so it is read only.
+
+    Args:
+        instance_id (int): id of the instance in the instances file.
+        sparse (bool, optional): return a scipy CSR matrix.
+        path (Path, optional): json file with the instances.
+
+    Returns:
+        np.ndarray | sps.csr_matrix: symmetric QUBO matrix.
+    """
+    instance = load_instances(path)[instance_id]
+    Q = get_Knapsack_QUBO(instance["values"], instance["weights"], instance["max_w"], sparse=sparse)
+    (Q.data if sparse else Q).setflags(write=False)
+    return Q
+
+
+def cost(solution, Q) -> float:
+    """Energy of a bitstring (items followed by slack bits) for a given QUBO, without rebuilding it.
+
+    Args:
+        solution (list): bitstring.
+        Q (np.ndarray | sps.csr_matrix): QUBO matrix.
+
+    Returns:
+        float: x^T Q x.
+    """
+    solution = np.asarray(solution, dtype=float)
+    return float(solution @ (Q @ solution))
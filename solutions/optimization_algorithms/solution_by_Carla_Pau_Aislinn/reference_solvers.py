@@ -0,0 +1,134 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from qubo import INSTANCES_PATH, get_Knapsack_QUBO, load_instances
+
+GROUND_TRUTH_PATH = Path(__file__).resolve().with_name("ground_truth_cache.json")
+
+
+def knapsack_dp(v, w, W) -> tuple[int, list[int]]:
+    """Solves the knapsack exactly, by dynamic programming over the capacities, in O(n·W).
+
+    Args:
+        v (list): values of each item.
+        w (list): weights of each item.
+        W (int): maximum weight the knapsack can hold.
+
+    Returns:
+        tuple[int, list[int]]: optimal value, and an optimal selection (1 if the item is taken, 0 if not).
+    """
+    best = np.zeros(W + 1, dtype=np.int64)
+    taken = np.zeros((len(v), W + 1), dtype=bool)
+    for i, (value, weight) in enumerate(zip(v, w)):
+        if weight > W:
+            continue
+        with_item = best[: W + 1 - weight] + value
+        taken[i, weight:] = with_item > best[weight:]
+        best[weight:] = np.where(taken[i, weight:], with_item, best[weight:])
+
+    # Walk back the table to recover the selection:
+    selection = [0] * len(v)
+    capacity = W
+    for i in reversed(range(len(v))):
+        if taken[i, capacity]:
+            selection[i] = 1
+            capacity -= w[i]
+    return int(best[W]), selection
+
+
+def knapsack_optimum(v, w, W) -> int:
+    """Best total value that fits in the knapsack."""
+    return knapsack_dp(v, w, W)[0]
+
+
+def brute_force_qubo(Q, batch_bits: int = 12) -> tuple[np.ndarray, float]:
+    """Finds the minimum of a QUBO by enumerating all the bitstrings.
+
+    The first `batch_bits` variables are enumerated at once as a batch of bitstrings, and the rest are walked
+    in Gray-code order, so that every step flips a single bit of the whole batch. Flipping bit i changes the
+    energy by 2 d (Qx)_i + Q_ii, with d = ±1, so each step costs O(n) per bitstring instead of O(n²).
+
+    Args:
+        Q (np.ndarray): symmetric QUBO matrix.
+        batch_bits (int, optional): number of variables enumerated at once, the batch has 2**batch_bits bitstrings.
+
+    Returns:
+        tuple[np.ndarray, float]: a minimizing bitstring, and its energy x^T Q x.
+    """
+    Q = np.asarray(Q, dtype=float)
+    n = len(Q)
+    c = min(n, batch_bits)
+
+    # Batch with all the values of the first c variables, and the walked variables starting at 0:
+    X = ((np.arange(2**c)[:, None] >> np.arange(c - 1, -1, -1)) & 1).astype(float)
+    X = np.hstack([X, np.zeros((2**c, n - c))])
+    fields = X @ Q
+    energies = np.einsum("bi,bi->b", fields, X)
+
+    best_energies, best_steps = energies.copy(), np.zeros(2**c, dtype=np.int64)
+    for step in range(1, 2 ** (n - c)):
+        # The k-th Gray code differs from the previous one in the lowest set bit of k:
+        i = c + (step & -step).bit_length() - 1
+        d = 1 - 2 * X[:, i]
+        energies += 2 * d * fields[:, i] + Q[i, i]
+        fields += d[:, None] * Q[i]
+        X[:, i] += d
+
+        improved = energies < best_energies
+        best_energies[improved] = energies[improved]
+        best_steps[improved] = step
+
+    b = np.argmin(best_energies)
+    gray = best_steps[b] ^ (best_steps[b] >> 1)
+    solution = np.concatenate([
+        (np.array([b]) >> np.arange(c - 1, -1, -1)) & 1,
+        (np.array([gray]) >> np.arange(n - c)) & 1,
+    ])
+    return solution.astype(np.int64), float(best_energies[b])
+
+
+def _instance_key(instance: dict) -> str:
+    """Content of an instance, to notice when the cached ground truth belongs to a different one."""
+    return json.dumps([instance["values"], instance["weights"], instance["max_w"]])
+
+
+def get_ground_truth(instance_id: int, brute_force_bits: int = 24, cache_path: Path = GROUND_TRUTH_PATH, path: Path = INSTANCES_PATH) -> dict:
+    """Ground truth of an instance, computed once and cached on disk by instance id.
+
+    Args:
+        instance_id (int): id of the instance in the instances file.
+        brute_force_bits (int, optional): maximum number of QUBO variables to brute force, bigger QUBOs are skipped.
+        cache_path (Path, optional): json file where the solved instances are stored.
+        path (Path, optional): json file with the instances.
+
+    Returns:
+        dict: 'optimum' and 'selection' from the DP, and 'qubo_energy' and 'qubo_solution' from the brute force (None if skipped).
+    """
+    instance = load_instances(path)[instance_id]
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, "r") as file:
+            cache = json.load(file)
+
+    record = cache.get(str(instance_id))
+    if record is not None and record["instance"] == _instance_key(instance):
+        return record
+
+    v, w, W = instance["values"], instance["weights"], instance["max_w"]
+    optimum, selection = knapsack_dp(v, w, W)
+    record = {"instance": _instance_key(instance), "optimum": optimum, "selection": selection, "qubo_energy": None, "qubo_solution": None}
+
+    Q = get_Knapsack_QUBO(v, w, W)
+    if len(Q) <= brute_force_bits:
+        qubo_solution, qubo_energy = brute_force_qubo(Q)
+        record.update({"qubo_energy": qubo_energy, "qubo_solution": qubo_solution.tolist()})
+
+    cache[str(instance_id)] = record
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(cache, file, indent=1)
+    os.replace(tmp_path, cache_path)
+    return record
@@ -0,0 +1,174 @@
+import copy
+import hashlib
+import json
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+from qibo.models import Circuit
+
+from helper_functions import get_circuit_gates, transpile_to_star_connectivity
+
+
+def transpiler_identity(transpiler_fun: Callable) -> str:
+    """Get a name identifying a transpiler function and the settings bound to it.
+
+    Args:
+        transpiler_fun (Callable): Transpiler function, or a `functools.partial` of it with fixed settings.
+
+    Returns:
+        str: Qualified name of the function, followed by the bound arguments if it is a partial.
+    """
+    if isinstance(transpiler_fun, partial):
+        settings = [repr(a) for a in transpiler_fun.args]
+        settings += [f"{k}={v!r}" for k, v in sorted(transpiler_fun.keywords.items())]
+        return f"{transpiler_identity(transpiler_fun.func)}({', '.join(settings)})"
+    return f"{transpiler_fun.__module__}.{transpiler_fun.__qualname__}"
+
+
+def circuit_fingerprint(
+    circuit: Circuit,
+    initial_map: Optional[dict] = None,
+    sabre: bool = False,
+    transpiler_fun: Callable = transpile_to_star_connectivity,
+) -> str:
+    """Get a canonical fingerprint of a transpilation job.
+
+    Args:
+        circuit (qibo.models.Circuit): Circuit to transpile.
+        initial_map (dict, optional): Initial layout to use.
+        sabre (bool, optional): Use Sabre router, instead of star.
+        transpiler_fun (Callable, optional): Transpiler function, see `transpiler_identity`.
+
+    Returns:
+        str: Hex digest identifying the circuit, the layout, the transpiler and the router settings.
+    """
+    job = {
+        "nqubits": circuit.nqubits,
+        "gates": [
+            (name, list(qubits), [float(p) for p in gate.parameters])
+            for (name, qubits), gate in zip(get_circuit_gates(circuit), circuit.queue)
+        ],
+        "initial_map": sorted((str(k), v) for k, v in initial_map.items()) if initial_map else None,
+        "sabre": bool(sabre),
+        "transpiler": transpiler_identity(transpiler_fun),
+    }
+    return hashlib.sha256(json.dumps(job, sort_keys=True).encode()).hexdigest()
+
+
+class TranspileCache:
+    """Cache of transpiled circuits and final layouts, keyed by fingerprint.
+
+    Results are always kept in memory. If a `directory` is given, they are also pickled there, one file per
+    fingerprint, so that repeated notebook or CI runs can reuse them.
+
+    Args:
+        directory (str, optional): Folder where to persist the results. If None, the cache is only in memory.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self._memory: Dict[str, Tuple[Circuit, dict]] = {}
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key: str) -> Optional[Tuple[Circuit, dict]]:
+        """Get a cached result, or None if the fingerprint is unknown."""
+        if key in self._memory:
+            return self._memory[key]
+        if self.directory is not None and os.path.exists(self._path(key)):
+            with open(self._path(key), "rb") as file:
+                self._memory[key] = pickle.load(file)
+            return self._memory[key]
+        return None
+
+    def put(self, key: str, result: Tuple[Circuit, dict]):
+        """Store a (transpiled circuit, final layout) result under the given fingerprint."""
+        self._memory[key] = result
+        if self.directory is not None:
+            # Write to a temporary file first, so that concurrent readers never see half written results.
+            tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as file:
+                pickle.dump(result, file)
+            os.replace(tmp_path, self._path(key))
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._memory or (self.directory is not None and os.path.exists(self._path(key)))
+
+    def __len__(self) -> int:
+        """Number of cached results, in memory or saved in the directory."""
+        keys = set(self._memory)
+        if self.directory is not None:
+            keys.update(name[: -len(".pkl")] for name in os.listdir(self.directory) if name.endswith(".pkl"))
+        return len(keys)
+
+    def clear(self):
+        """Remove all the cached results, from memory and disk."""
+        self._memory.clear()
+        if self.directory is not None:
+            for file_name in os.listdir(self.directory):
+                if file_name.endswith(".pkl"):
+                    os.remove(os.path.join(self.directory, file_name))
+
+
+def _transpile_job(job: tuple) -> Tuple[Circuit, dict]:
+    """Run a single transpilation job in a worker process."""
+    transpiler_fun, circuit, initial_map, sabre = job
+    return transpiler_fun(circuit, initial_map=initial_map, sabre=sabre)
+
+
+def batch_transpile(
+    circuits: List[Circuit],
+    initial_map: Optional[dict] = None,
+    sabre: bool = False,
+    cache: Optional[TranspileCache] = None,
+    transpiler_fun: Callable = transpile_to_star_connectivity,
+    max_workers: Optional[int] = None,
+) -> List[Tuple[Circuit, dict]]:
+    """Transpile a batch of circuits, serving repeated circuits from a cache.
+
+    Circuits with the same fingerprint are only transpiled once, and the cache misses are run in parallel
+    worker processes. The fingerprint includes the transpiler, so several transpilers can share a cache; bind
+    any other router settings with `functools.partial` to make them part of it too. Notice that a cached Sabre
+    routing is replayed as is, so use `find_best_routing` when you want to explore different random routings
+    of the same circuit. Each result is a copy of the cached one, so it can be modified freely.
+
+    Args:
+        circuits (list[qibo.models.Circuit]): Circuits to transpile.
+        initial_map (dict, optional): Initial layout to use for all the circuits.
+        sabre (bool, optional): Use Sabre router, instead of star.
+        cache (TranspileCache, optional): Cache to read from and store to. If None, a new in-memory one is used.
+        transpiler_fun (Callable, optional): Transpiler function, must be picklable (defined at module level).
+        max_workers (int, optional): Number of worker processes. If 1, the misses are transpiled in this process.
+
+    Returns:
+        list[tuple[qibo.models.Circuit, dict]]: Transpiled circuit and final layout, for each given circuit.
+    """
+    if cache is None:
+        cache = TranspileCache()
+
+    keys = [circuit_fingerprint(circuit, initial_map, sabre, transpiler_fun) for circuit in circuits]
+
+    # Collect the unique misses, keeping the first circuit found for each fingerprint:
+    misses: Dict[str, Circuit] = {}
+    for key, circuit in zip(keys, circuits):
+        if key not in misses and key not in cache:
+            misses[key] = circuit
+
+    jobs = [(transpiler_fun, circuit, initial_map, sabre) for circuit in misses.values()]
+    if max_workers == 1 or len(jobs) <= 1:
+        results = [_transpile_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_transpile_job, jobs))
+
+    for key, result in zip(misses, results):
+        cache.put(key, result)
+
+    # Copies, so that modifying a result does not change the cache, nor the results of repeated circuits:
+    return [copy.deepcopy(cache.get(key)) for key in keys]
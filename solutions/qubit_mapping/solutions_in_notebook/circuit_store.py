@@ -0,0 +1,145 @@
+import json
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from qibo import gates
+from qibo.models import Circuit
+
+from helper_functions import create_gate, gate_class
+
+# Arrays of a store, each one saved as a .npy file of the store directory:
+ARRAYS = ("nqubits", "circuit_offsets", "opcodes", "qubits", "param_offsets", "params", "layouts")
+
+
+def save_circuits(
+    directory: str,
+    circuits: Sequence[Circuit],
+    layouts: Optional[Sequence[dict]] = None,
+    keys: Optional[Sequence[str]] = None,
+):
+    """Save a batch of circuits, and optionally their final layouts, in a compact binary format.
+
+    The gates of all the circuits are stored together: an opcode array (index in a table of gate names), a
+    qubit array padded with -1, and the flattened gate parameters. Offset arrays give the gates of each circuit
+    and the parameters of each gate, and the layouts are stored as the logical qubit of each physical one.
+
+    Args:
+        directory (str): Folder where to write the store. The files of a previous store are overwritten.
+        circuits (list[qibo.models.Circuit]): Circuits to save, e.g. transpiled ones.
+        layouts (list[dict], optional): Final layout of each circuit, with keys "q{physical}" and logical values.
+        keys (list[str], optional): Identifier of each circuit, e.g. its `circuit_fingerprint`.
+    """
+    names: Dict[str, int] = {}
+    opcodes, qubits, params = [], [], []
+    circuit_offsets, param_offsets = [0], [0]
+    for circuit in circuits:
+        for gate in circuit.queue:
+            if getattr(gate, "is_controlled_by", False):
+                raise ValueError(f"Gate {gate_class(gate)} with `controlled_by` qubits can not be stored.")
+            opcodes.append(names.setdefault(gate_class(gate), len(names)))
+            qubits.append(gate.qubits)
+            params.extend(float(p) for p in gate.parameters)
+            param_offsets.append(len(params))
+        circuit_offsets.append(len(opcodes))
+
+    arity = max((len(q) for q in qubits), default=1)
+    qubits_array = np.full((len(qubits), arity), -1, dtype=np.int16)
+    for row, gate_qubits in enumerate(qubits):
+        qubits_array[row, : len(gate_qubits)] = gate_qubits
+
+    nqubits = np.array([circuit.nqubits for circuit in circuits], dtype=np.int16)
+    layouts_array = np.full((len(circuits), int(nqubits.max(initial=0))), -1, dtype=np.int16)
+    for row, layout in enumerate(layouts or []):
+        for physical, logical in layout.items():
+            layouts_array[row, int(str(physical).lstrip("q"))] = logical
+
+    arrays = {
+        "nqubits": nqubits,
+        "circuit_offsets": np.array(circuit_offsets, dtype=np.int64),
+        "opcodes": np.array(opcodes, dtype=np.int16),
+        "qubits": qubits_array,
+        "param_offsets": np.array(param_offsets, dtype=np.int64),
+        "params": np.array(params, dtype=np.float64),
+        "layouts": layouts_array,
+    }
+    os.makedirs(directory, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f"{name}.npy"), array)
+    with open(os.path.join(directory, "header.json"), "w") as file:
+        json.dump({"gate_names": list(names), "has_layouts": layouts is not None, "keys": list(keys or [])}, file)
+
+
+class CircuitStore:
+    """Read-only access to the circuits saved with `save_circuits`.
+
+    The arrays are memory-mapped, so opening a store is instantaneous whatever its size, and several processes
+    reading the same store share its pages. The qibo circuits are only rebuilt when accessed, and the last ones
+    are kept in memory.
+
+    Args:
+        directory (str): Folder of the store.
+        cache_size (int, optional): Number of rebuilt circuits kept in memory.
+    """
+
+    def __init__(self, directory: str, cache_size: int = 128):
+        self.directory = directory
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r"))
+        with open(os.path.join(directory, "header.json")) as file:
+            header = json.load(file)
+        self.gate_names: List[str] = header["gate_names"]
+        self.has_layouts: bool = header["has_layouts"]
+        self.keys: List[str] = header["keys"]
+        self._index = {key: i for i, key in enumerate(self.keys)}
+        self._build = lru_cache(maxsize=cache_size)(self._build_circuit)
+
+    def __len__(self) -> int:
+        return len(self.nqubits)
+
+    def __getitem__(self, i: int) -> Tuple[Circuit, Optional[dict]]:
+        """Get the i-th circuit, rebuilt as a qibo Circuit, and its final layout (None if not saved)."""
+        if not -len(self) <= i < len(self):
+            raise IndexError(f"Circuit {i} out of range for a store of {len(self)} circuits.")
+        i = i % len(self)
+        return self._build(i), self.layout(i)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def index(self, key: str) -> int:
+        """Get the position of the circuit saved with the given key."""
+        return self._index[key]
+
+    def gate_arrays(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the opcodes and the (padded) qubits of the gates of the i-th circuit, as views of the store."""
+        start, stop = self.circuit_offsets[i], self.circuit_offsets[i + 1]
+        return self.opcodes[start:stop], self.qubits[start:stop]
+
+    def count_gates(self, name: str) -> np.ndarray:
+        """Count the gates of a type, e.g. "SWAP", in every circuit, without rebuilding them."""
+        if name not in self.gate_names:
+            return np.zeros(len(self), dtype=np.int64)
+        matches = np.concatenate([[0], np.cumsum(self.opcodes == self.gate_names.index(name))])
+        return matches[self.circuit_offsets[1:]] - matches[self.circuit_offsets[:-1]]
+
+    def layout(self, i: int) -> Optional[dict]:
+        """Get the final layout of the i-th circuit, with keys "q{physical}", or None if not saved."""
+        if not self.has_layouts:
+            return None
+        return {f"q{p}": int(logical) for p, logical in enumerate(self.layouts[i, : self.nqubits[i]]) if logical >= 0}
+
+    def _build_circuit(self, i: int) -> Circuit:
+        opcodes, qubits = self.gate_arrays(i)
+        first_gate = self.circuit_offsets[i]
+        circuit = Circuit(int(self.nqubits[i]))
+        for g, (opcode, gate_qubits) in enumerate(zip(opcodes, qubits)):
+            name = self.gate_names[opcode]
+            gate_qubits = tuple(int(q) for q in gate_qubits if q >= 0)
+            params = self.params[self.param_offsets[first_gate + g] : self.param_offsets[first_gate + g + 1]]
+            if len(params):
+                circuit.add(getattr(gates, name)(*gate_qubits, *(float(p) for p in params)))
+            else:
+                circuit.add(create_gate(name, gate_qubits))
+        return circuit
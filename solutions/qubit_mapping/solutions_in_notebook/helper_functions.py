@@ -1,14 +1,10 @@
-from copy import deepcopy
-
-import matplotlib.pyplot as plt
 import networkx as nx
 import numpy as np
 from qibo import gates
 from qibo.models import Circuit
-from qibo.transpiler.pipeline import Passes
-from qibo.transpiler.placer import Custom, StarConnectivityPlacer
-from qibo.transpiler.router import Sabre, StarConnectivityRouter
-from qibo.ui import plot_circuit
+
+# matplotlib, qibo.ui and the transpiler are imported inside the functions that use them, so that workers that
+# only handle circuits do not pay their import time (see import_benchmark.py).
 
 
 def gate_class(gate: gates.Gate) -> str:
@@ -41,26 +37,96 @@ def create_gate(gate_class: str, qubits: tuple[int]) -> gates.Gate:
     return getattr(gates, gate_class)(*qubits)
 
 
+class Layout:
+    """Permutation between the physical and the logical qubits of a chip, with O(1) in-place SWAPs.
+
+    Both directions are kept in arrays, so looking up and swapping qubits never copies the layout. Every SWAP
+    is recorded, so routers that backtrack can take a `checkpoint` and `rewind` to it.
+
+    Args:
+        layout (dict): Physical to logical mapping, with keys "q{physical}", as the transpiler layouts.
+    """
+
+    def __init__(self, layout: dict):
+        self.logical_of = np.empty(len(layout), dtype=np.int64)
+        for key, logical in layout.items():
+            self.logical_of[int(str(key).lstrip("q"))] = logical
+        self.physical_of = np.empty_like(self.logical_of)
+        self.physical_of[self.logical_of] = np.arange(len(self.logical_of))
+        self._history = []
+
+    @classmethod
+    def trivial(cls, nqubits: int) -> "Layout":
+        """Layout where each logical qubit is on the physical qubit with the same index."""
+        return cls({f"q{q}": q for q in range(nqubits)})
+
+    def __len__(self) -> int:
+        return len(self.logical_of)
+
+    def swap(self, physical_1: int, physical_2: int):
+        """Swap the logical qubits of two physical qubits, as a SWAP gate does."""
+        logical_1, logical_2 = self.logical_of[physical_1], self.logical_of[physical_2]
+        self.logical_of[physical_1], self.logical_of[physical_2] = logical_2, logical_1
+        self.physical_of[logical_1], self.physical_of[logical_2] = physical_2, physical_1
+        self._history.append((physical_1, physical_2))
+
+    def checkpoint(self) -> int:
+        """Get a checkpoint of the current layout, to `rewind` to it later."""
+        return len(self._history)
+
+    def rewind(self, checkpoint: int = 0):
+        """Undo the SWAPs done since the checkpoint, by default all of them."""
+        while len(self._history) > checkpoint:
+            physical_1, physical_2 = self._history.pop()
+            self.swap(physical_1, physical_2)
+            self._history.pop()
+
+    def sorting_swaps(self) -> list[tuple[int, int]]:
+        """Get the SWAPs that bring every logical qubit back to the physical qubit with its index.
+
+        Each SWAP puts at least one logical qubit in place, so there are at most `len(self) - 1` of them.
+        The layout itself is not changed.
+        """
+        logical_of = self.logical_of.copy()
+        swaps = []
+        for physical in range(len(logical_of)):
+            while logical_of[physical] != physical:
+                target = logical_of[physical]
+                swaps.append((physical, int(target)))
+                logical_of[physical], logical_of[target] = logical_of[target], logical_of[physical]
+        return swaps
+
+    def to_dict(self) -> dict:
+        """Get the physical to logical mapping, with keys "q{physical}"."""
+        return {f"q{physical}": int(logical) for physical, logical in enumerate(self.logical_of)}
+
+    def copy(self) -> "Layout":
+        """Get a copy of the layout, without the SWAP history."""
+        return Layout(self.to_dict())
+
+
 def find_final_reordering(circuit, layout):
     """Get the final reordering of the qubits in the circuit, adding the layout and the SWAP gates.
 
     Args:
         circuit (qibo.models.Circuit): Circuit to extract the SWAPS from.
-        layout (dict): Initial layout used for the circuit.
+        layout (dict | Layout): Initial layout used for the circuit.
 
     Returns:
         dict: Final order of the qubits.
     """
-    reordering_dict = deepcopy(layout)
+    reordering = Layout(layout.to_dict() if isinstance(layout, Layout) else layout)
     for gate, qubits in get_circuit_gates(circuit):
         if gate == "SWAP":
-            update_reordering(qubits, reordering_dict)
-    return reordering_dict
+            reordering.swap(*qubits)
+    return reordering.to_dict()
 
 
 def update_reordering(pair_to_change: tuple, layout):
     """Get a new reordering of the qubits, given a change in two qubits.
 
+    For many changes, use a `Layout`, which swaps in place instead of copying the layout each time.
+
     Args:
         reordering (tuple[int, int]): Pair of qubits to swap in the given layout.
         layout (dict): Initial layout used for the circuit.
@@ -68,16 +134,11 @@ def update_reordering(pair_to_change: tuple, layout):
     Returns:
         dict: Final order of the qubits.
     """
-    reordering_dict = deepcopy(layout)
+    reordering_dict = dict(layout)
 
-    key_1 = pair_to_change[0]
-    key_2 = pair_to_change[1]
-
-    value1 = deepcopy(reordering_dict[f"q{key_1}"])
-    value2 = deepcopy(reordering_dict[f"q{key_2}"])
-
-    reordering_dict[f"q{key_1}"] = value2
-    reordering_dict[f"q{key_2}"] = value1
+    key_1 = f"q{pair_to_change[0]}"
+    key_2 = f"q{pair_to_change[1]}"
+    reordering_dict[key_1], reordering_dict[key_2] = layout[key_2], layout[key_1]
 
     return reordering_dict
 
@@ -109,6 +170,10 @@ def transpile_to_star_connectivity(
         qibo.models.Circuit: Transpiled circuit.
         dict: Final layout (initial_mapping) used.
     """
+    from qibo.transpiler.pipeline import Passes
+    from qibo.transpiler.placer import Custom, StarConnectivityPlacer
+    from qibo.transpiler.router import Sabre, StarConnectivityRouter
+
     # Layout and Routing passes
     custom_passes = []
     if initial_map:
@@ -139,6 +204,8 @@ def plot_transpiled_circuit(circuit, final_layout):
         circuit (qibo.models.Circuit): Transpiled circuit.
         final_layout (dict): Final layout used.
     """
+    import matplotlib.pyplot as plt
+    from qibo.ui import plot_circuit
 
     print("Final layout:", final_layout)
     ax, fig = plot_circuit(circuit)
@@ -151,12 +218,17 @@ def find_best_routing(
     sabre=False,
     transpiler_fun=transpile_to_star_connectivity,
     iterations=10,
+    score_fun=None,
 ):
     """Find the best initial mapping for the circuit.
 
     Args:
         circuit (qibo.models.Circuit): Circuit to transpile.
         sabre (bool, optional): Use Sabre router, instead of star.
+        score_fun (callable, optional): Score of a transpiled circuit, lower is better. Defaults to the number
+            of SWAPs. To rank by noisy fidelity instead, adapt `routing_fidelity.estimated_success_probability`,
+            which takes a list of circuits and a noise model, as in
+            `lambda circuit: -estimated_success_probability([circuit], noise)[0]`.
 
     Returns:
         dict: Best initial mapping found.
@@ -167,7 +239,10 @@ def find_best_routing(
 
     for _ in range(iterations):
         transpiled_circ, final_layout = transpiler_fun(circuit, initial_map=initial_map, sabre=sabre)
-        score = len(transpiled_circ.gates_of_type(gates.SWAP))
+        if score_fun is None:
+            score = len(transpiled_circ.gates_of_type(gates.SWAP))
+        else:
+            score = score_fun(transpiled_circ)
 
         if best_score is None or score < best_score:
             best_score = score
@@ -0,0 +1,61 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+REPO_PATH = Path(__file__).resolve().parents[3]
+HELPER_MODULES = {
+    "qubit_mapping": REPO_PATH / "solutions" / "qubit_mapping" / "solutions_in_notebook",
+    "quantum101": REPO_PATH / "challenges" / "quantum101",
+}
+HEAVY_MODULES = ["matplotlib", "networkx", "qiskit", "qibo.ui", "qibo.transpiler.pipeline"]
+
+# Run in a fresh interpreter, so nothing is already imported or cached in memory:
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def cold_import_time(directory: Path, module: str = "helper_functions", repeats: int = 5) -> Dict:
+    """Measure the time to import a module in a new Python process, as a worker of a pool would.
+
+    Args:
+        directory (Path): Folder of the module, used as the working directory of the process.
+        module (str, optional): Name of the module to import.
+        repeats (int, optional): Number of fresh processes to time.
+
+    Returns:
+        dict: Median and minimum import time in seconds, and the heavy dependencies loaded by the import.
+    """
+    times: List[float] = []
+    loaded: List[str] = []
+    for _ in range(repeats):
+        process = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=directory,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        times.append(result["seconds"])
+        loaded = result["loaded"]
+    return {"median": statistics.median(times), "min": min(times), "loaded": loaded}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start import time of the helper modules.")
+    parser.add_argument("--repeats", type=int, default=5, help="Number of fresh processes per module.")
+    args = parser.parse_args()
+
+    for name, directory in HELPER_MODULES.items():
+        result = cold_import_time(directory, repeats=args.repeats)
+        loaded = ", ".join(result["loaded"]) or "none"
+        print(f"{name:>14}: median {result['median']:.3f} s, min {result['min']:.3f} s, heavy modules loaded: {loaded}")
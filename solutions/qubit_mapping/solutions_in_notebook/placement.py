@@ -0,0 +1,166 @@
+import time
+from typing import Dict, List, Optional
+
+import networkx as nx
+import numpy as np
+from networkx.algorithms.isomorphism import GraphMatcher
+from qibo.models import Circuit
+
+from helper_functions import star_connectivity
+
+
+def gate_timesteps(circuit: Circuit) -> List[int]:
+    """Get the timestep (ASAP layer) in which each gate of the circuit is executed.
+
+    Args:
+        circuit (qibo.models.Circuit): Circuit to get the timesteps from.
+
+    Returns:
+        list[int]: Timestep of each gate, in the order of `circuit.queue`.
+    """
+    qubit_free_at = [0] * circuit.nqubits
+    timesteps = []
+    for gate in circuit.queue:
+        step = max(qubit_free_at[q] for q in gate.qubits)
+        for q in gate.qubits:
+            qubit_free_at[q] = step + 1
+        timesteps.append(step)
+    return timesteps
+
+
+def interaction_graph(circuit: Circuit, decay: float = 0.5) -> nx.Graph:
+    """Build the weighted interaction graph of the logical qubits of a circuit.
+
+    Each two-qubit gate adds `decay ** timestep` to the weight of the edge between its qubits, so that gates
+    at the beginning of the circuit, which must be executable with the initial placement, count more.
+
+    Args:
+        circuit (qibo.models.Circuit): Circuit to get the interactions from.
+        decay (float, optional): Weight decay per timestep, between 0 and 1. With 1 all the gates count the same.
+
+    Returns:
+        nx.Graph: Graph with a node per logical qubit and weighted edges between interacting qubits.
+    """
+    graph = nx.Graph()
+    graph.add_nodes_from(range(circuit.nqubits))
+    for gate, step in zip(circuit.queue, gate_timesteps(circuit)):
+        if len(gate.qubits) != 2:
+            continue
+        q0, q1 = gate.qubits
+        weight = graph.get_edge_data(q0, q1, {"weight": 0.0})["weight"]
+        graph.add_edge(q0, q1, weight=weight + decay**step)
+    return graph
+
+
+def placement_cost(interactions: nx.Graph, layout: Dict[str, int], connectivity: nx.Graph) -> float:
+    """Get the cost of a placement, as the weighted number of SWAPs needed to make every interaction adjacent.
+
+    Args:
+        interactions (nx.Graph): Weighted interaction graph, from `interaction_graph`.
+        layout (dict): Physical to logical qubit mapping, with the keys as "q{physical}".
+        connectivity (nx.Graph): Chip connectivity.
+
+    Returns:
+        float: Sum over the interactions of `weight * (distance - 1)`.
+    """
+    distances = dict(nx.all_pairs_shortest_path_length(connectivity))
+    physical_of = {logical: int(key[1:]) for key, logical in layout.items()}
+    return sum(
+        data["weight"] * (distances[physical_of[q0]][physical_of[q1]] - 1)
+        for q0, q1, data in interactions.edges(data=True)
+    )
+
+
+def find_initial_placement(
+    circuit: Circuit,
+    connectivity: Optional[nx.Graph] = None,
+    decay: float = 0.5,
+    iterations: int = 5000,
+    time_budget: Optional[float] = None,
+    seed: int = 0,
+) -> Dict[str, int]:
+    """Find an initial placement of the logical qubits of a circuit on the chip.
+
+    First it looks for a subgraph monomorphism of the interaction graph into the connectivity, which would
+    make every gate executable without SWAPs. If there is none, it anneals the placement, swapping the logical
+    qubits of two physical qubits at a time, to minimize the `placement_cost`. The search is anytime: it can
+    be stopped after `time_budget` seconds, and it always returns the best placement found so far.
+
+    The result can be passed directly as `initial_map` to `transpile_to_star_connectivity`.
+
+    Args:
+        circuit (qibo.models.Circuit): Circuit to place.
+        connectivity (nx.Graph, optional): Chip connectivity. Defaults to `star_connectivity()`.
+        decay (float, optional): Weight decay per timestep of the interactions.
+        iterations (int, optional): Number of annealing steps.
+        time_budget (float, optional): Maximum number of seconds of annealing. If None, there is no limit.
+        seed (int, optional): Seed of the annealing, the same seed always gives the same placement.
+
+    Returns:
+        dict: Physical to logical qubit mapping, with the keys as "q{physical}".
+    """
+    if connectivity is None:
+        connectivity = star_connectivity()
+
+    physical_qubits = sorted(connectivity.nodes)
+    if circuit.nqubits > len(physical_qubits):
+        raise ValueError(f"Circuit with {circuit.nqubits} qubits does not fit in a chip of {len(physical_qubits)}.")
+
+    interactions = interaction_graph(circuit, decay=decay)
+
+    # If the interactions fit in the chip, there is no need to search:
+    matcher = GraphMatcher(connectivity, interactions)
+    match = next(matcher.subgraph_monomorphisms_iter(), None)
+    if match is not None:
+        return _complete_layout({physical: logical for physical, logical in match.items()}, physical_qubits)
+
+    index = {physical: i for i, physical in enumerate(physical_qubits)}
+    distances = np.zeros((len(physical_qubits), len(physical_qubits)))
+    for source, lengths in nx.all_pairs_shortest_path_length(connectivity):
+        for target, length in lengths.items():
+            distances[index[source], index[target]] = length - 1
+
+    n_slots = len(physical_qubits)
+    weights = np.zeros((n_slots, n_slots))  # Logical interactions, padded with idle logical qubits.
+    for q0, q1, data in interactions.edges(data=True):
+        weights[q0, q1] = weights[q1, q0] = data["weight"]
+
+    # Anneal the slot (physical index) of every logical qubit, starting from the trivial placement:
+    slot_of = np.arange(n_slots)
+    cost = 0.5 * np.sum(weights * distances[np.ix_(slot_of, slot_of)])
+    best_slot_of, best_cost = slot_of.copy(), cost
+
+    rng = np.random.default_rng(seed)
+    temperature = max(weights.max(), 1e-9)
+    start = time.perf_counter()
+    for step in range(iterations):
+        if best_cost == 0 or (time_budget is not None and time.perf_counter() - start > time_budget):
+            break
+        a, b = rng.choice(n_slots, size=2, replace=False)
+
+        # Only the interactions of the two moved logical qubits change their distance:
+        new_slot_of = slot_of.copy()
+        new_slot_of[a], new_slot_of[b] = slot_of[b], slot_of[a]
+        delta = 0.0
+        for q in (a, b):
+            delta += weights[q] @ (distances[new_slot_of[q], new_slot_of] - distances[slot_of[q], slot_of])
+        delta -= weights[a, b] * (distances[new_slot_of[a], new_slot_of[b]] - distances[slot_of[a], slot_of[b]])
+
+        current_temperature = temperature * (1 - step / iterations) + 1e-9
+        if delta <= 0 or rng.random() < np.exp(-delta / current_temperature):
+            slot_of, cost = new_slot_of, cost + delta
+            if cost < best_cost - 1e-12:
+                best_slot_of, best_cost = slot_of.copy(), cost
+
+    return _complete_layout(
+        {physical_qubits[best_slot_of[logical]]: logical for logical in range(circuit.nqubits)}, physical_qubits
+    )
+
+
+def _complete_layout(logical_of: Dict[int, int], physical_qubits: List[int]) -> Dict[str, int]:
+    """Fill the physical qubits without a logical qubit, and return the layout with "q{physical}" keys."""
+    free_logicals = iter(sorted(set(range(len(physical_qubits))) - set(logical_of.values())))
+    for physical in physical_qubits:
+        if physical not in logical_of:
+            logical_of[physical] = next(free_logicals)
+    return {f"q{physical}": logical_of[physical] for physical in physical_qubits}
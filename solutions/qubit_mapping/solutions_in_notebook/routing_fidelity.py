@@ -0,0 +1,209 @@
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from qibo.models import Circuit
+
+from helper_functions import get_circuit_gates
+
+# Gates the Pauli frames can be propagated through, the rest of the Clifford group is not needed by the routers:
+PAULI_GATES = {"I", "X", "Y", "Z", "M"}
+FRAME_GATES = PAULI_GATES | {"H", "S", "SDG", "CNOT", "CZ", "SWAP"}
+
+
+class ChipNoise:
+    """Per-gate depolarizing and readout noise model of a chip.
+
+    Each error rate can be a single number for the whole chip, or a dictionary with a value per qubit (single
+    qubit gates and readout) or per coupler, keyed by the sorted pair of qubits (two-qubit gates). SWAPs are
+    executed as three CNOTs.
+
+    Args:
+        single_qubit (float | dict, optional): Depolarizing probability after each single qubit gate.
+        two_qubit (float | dict, optional): Two-qubit depolarizing probability after each CNOT or CZ.
+        readout (float | dict, optional): Probability of flipping the measured bit.
+    """
+
+    def __init__(
+        self,
+        single_qubit: Union[float, Dict[int, float]] = 1e-3,
+        two_qubit: Union[float, Dict[Tuple[int, int], float]] = 1e-2,
+        readout: Union[float, Dict[int, float]] = 2e-2,
+    ):
+        self.single_qubit = single_qubit
+        self.two_qubit = two_qubit
+        self.readout = readout
+
+    @staticmethod
+    def _rate(rates, key) -> float:
+        return rates[key] if isinstance(rates, dict) else rates
+
+    def gate_error(self, qubits: Sequence[int]) -> float:
+        """Depolarizing probability after a native gate on the given qubits."""
+        if len(qubits) == 1:
+            return self._rate(self.single_qubit, qubits[0])
+        return self._rate(self.two_qubit, tuple(sorted(qubits)))
+
+    def readout_error(self, qubit: int) -> float:
+        """Probability of flipping the measured bit of a qubit."""
+        return self._rate(self.readout, qubit)
+
+
+def error_locations(circuit: Circuit, noise: ChipNoise) -> List[Tuple[str, Tuple[int, ...], float]]:
+    """Get the native gates of a circuit with the depolarizing probability after each one.
+
+    Args:
+        circuit (qibo.models.Circuit): Routed circuit.
+        noise (ChipNoise): Noise model of the chip.
+
+    Returns:
+        list[tuple]: (gate name, qubits, error probability) of each native gate, with the SWAPs as three CNOTs.
+    """
+    locations = []
+    for name, qubits in get_circuit_gates(circuit):
+        if name == "M":
+            continue
+        if name == "SWAP":
+            a, b = qubits
+            p = noise.gate_error(qubits)
+            locations.extend([("CNOT", (a, b), p), ("CNOT", (b, a), p), ("CNOT", (a, b), p)])
+        else:
+            locations.append((name, tuple(qubits), noise.gate_error(qubits)))
+    return locations
+
+
+def estimated_success_probability(circuits: Sequence[Circuit], noise: ChipNoise, measured: Optional[List[int]] = None) -> np.ndarray:
+    """Get the estimated success probability of a batch of routed circuits.
+
+    It is the probability that no gate and no readout fails, the product of (1 - p) over all the error
+    locations. The error locations of every circuit are counted in a matrix, so the whole batch is scored with
+    a single product with the log survival probabilities of the locations.
+
+    Args:
+        circuits (list[qibo.models.Circuit]): Routed circuits, on the same chip.
+        noise (ChipNoise): Noise model of the chip.
+        measured (list[int], optional): Measured qubits. Defaults to all the qubits.
+
+    Returns:
+        np.ndarray: Estimated success probability of each circuit.
+    """
+    index: Dict[Tuple[int, ...], int] = {}
+    survival: List[float] = []
+    rows, columns = [], []
+    for row, circuit in enumerate(circuits):
+        for _, qubits, p in error_locations(circuit, noise):
+            key = tuple(sorted(qubits))
+            if key not in index:
+                index[key] = len(survival)
+                survival.append(np.log1p(-p))
+            rows.append(row)
+            columns.append(index[key])
+
+    counts = np.zeros((len(circuits), max(len(survival), 1)))
+    np.add.at(counts, (rows, columns), 1)
+    log_fidelities = counts[:, : len(survival)] @ np.array(survival)
+
+    for row, circuit in enumerate(circuits):
+        qubits = range(circuit.nqubits) if measured is None else measured
+        log_fidelities[row] += sum(np.log1p(-noise.readout_error(q)) for q in qubits)
+    return np.exp(log_fidelities)
+
+
+def _apply_gate(x: np.ndarray, z: np.ndarray, name: str, qubits: Tuple[int, ...]):
+    """Conjugates the Pauli frames (x, z bits of every trajectory) by a Clifford gate, in place."""
+    if name in PAULI_GATES:
+        return
+    if name == "H":
+        (q,) = qubits
+        x[:, q], z[:, q] = z[:, q].copy(), x[:, q].copy()
+    elif name in ("S", "SDG"):
+        (q,) = qubits
+        z[:, q] ^= x[:, q]
+    elif name == "CNOT":
+        control, target = qubits
+        x[:, target] ^= x[:, control]
+        z[:, control] ^= z[:, target]
+    elif name == "CZ":
+        a, b = qubits
+        z[:, a] ^= x[:, b]
+        z[:, b] ^= x[:, a]
+    elif name == "SWAP":
+        a, b = qubits
+        x[:, [a, b]] = x[:, [b, a]]
+        z[:, [a, b]] = z[:, [b, a]]
+    else:
+        raise ValueError(f"Gate {name} is not supported by the Pauli frame simulator, only {sorted(FRAME_GATES)}.")
+
+
+def pauli_frame_fidelity(
+    circuit: Circuit,
+    noise: ChipNoise,
+    shots: int = 10000,
+    measured: Optional[List[int]] = None,
+    seed: Optional[int] = None,
+) -> float:
+    """Get the probability that a routed Clifford circuit returns its noiseless outcome, by sampling Pauli frames.
+
+    Every trajectory carries the Pauli error accumulated so far as x and z bits per qubit. After each gate the
+    frames are conjugated by it, and a random Pauli is added with the depolarizing probability of the gate.
+    At the end, a bit is flipped if its frame has an x component or its readout fails. All the trajectories
+    are propagated at once, so it costs O(gates x shots) bit operations, with no statevector.
+
+    Args:
+        circuit (qibo.models.Circuit): Routed circuit, made of the gates in `FRAME_GATES`.
+        noise (ChipNoise): Noise model of the chip.
+        shots (int, optional): Number of sampled trajectories.
+        measured (list[int], optional): Measured qubits. Defaults to all the qubits.
+        seed (int, optional): Seed of the random generator.
+
+    Returns:
+        float: Fraction of the trajectories where no measured bit is flipped.
+    """
+    rng = np.random.default_rng(seed)
+    x = np.zeros((shots, circuit.nqubits), dtype=bool)
+    z = np.zeros((shots, circuit.nqubits), dtype=bool)
+
+    for name, qubits, p in error_locations(circuit, noise):
+        _apply_gate(x, z, name, qubits)
+        # Depolarizing error: one of the 4**n - 1 non identity Paulis on the gate qubits, with probability p.
+        failed = rng.random(shots) < p
+        paulis = rng.integers(1, 4 ** len(qubits), size=int(failed.sum()))
+        for position, q in enumerate(qubits):
+            x[failed, q] ^= (paulis >> (2 * position) & 1).astype(bool)
+            z[failed, q] ^= (paulis >> (2 * position + 1) & 1).astype(bool)
+
+    qubits = list(range(circuit.nqubits)) if measured is None else list(measured)
+    readout = np.array([noise.readout_error(q) for q in qubits])
+    flipped = x[:, qubits] ^ (rng.random((shots, len(qubits))) < readout)
+    return float(np.mean(~flipped.any(axis=1)))
+
+
+def rank_routings(
+    candidates: Sequence[Tuple[Circuit, dict]],
+    noise: ChipNoise,
+    method: str = "esp",
+    shots: int = 10000,
+    seed: Optional[int] = None,
+) -> List[Tuple[float, Circuit, dict]]:
+    """Rank routed circuits by their expected fidelity on a noisy chip, instead of by their number of SWAPs.
+
+    Args:
+        candidates (list[tuple]): (transpiled circuit, final layout) pairs, as returned by the transpiler.
+        noise (ChipNoise): Noise model of the chip.
+        method (str, optional): "esp" for `estimated_success_probability`, or "frames" for `pauli_frame_fidelity`.
+        shots (int, optional): Number of trajectories per circuit of the "frames" method.
+        seed (int, optional): Seed of the "frames" method.
+
+    Returns:
+        list[tuple]: (fidelity, circuit, final layout) of each candidate, from the best to the worst.
+    """
+    circuits = [circuit for circuit, _ in candidates]
+    if method == "esp":
+        scores = estimated_success_probability(circuits, noise)
+    elif method == "frames":
+        rng = np.random.default_rng(seed)
+        scores = [pauli_frame_fidelity(circuit, noise, shots, seed=rng.integers(2**32)) for circuit in circuits]
+    else:
+        raise ValueError(f"Unknown method {method}, use 'esp' or 'frames'.")
+
+    order = np.argsort(-np.asarray(scores), kind="stable")
+    return [(float(scores[i]), *candidates[i]) for i in order]
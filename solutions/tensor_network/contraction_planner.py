@@ -0,0 +1,198 @@
+"""Contraction order planner for ncon tensor networks.
+
+The networks are given as in `ncon`: a list of tensors and a list with the indices of each one, where the
+positive indices are contracted and the negative ones are left open.
+"""
+from functools import lru_cache
+from math import prod
+from typing import NamedTuple
+
+import numpy as np
+from ncon import ncon
+
+
+class ContractionPlan(NamedTuple):
+    """Contraction order of a network and its estimated cost.
+
+    Attributes:
+        order (tuple[int, ...]): contracted indices in the order to pass to `ncon(..., order=order)`. It is a
+            tuple, because the plans are cached and shared by all the callers.
+        flops (int): number of multiply-adds of the pairwise contractions.
+        peak_size (int): number of elements of the biggest intermediate tensor.
+    """
+
+    order: tuple[int, ...]
+    flops: int
+    peak_size: int
+
+
+def _network_dimensions(shapes, indices) -> dict[int, int]:
+    """Dimension of every index of the network."""
+    return {index: dim for shape, tensor_indices in zip(shapes, indices) for index, dim in zip(tensor_indices, shape)}
+
+
+def check_network(shapes, indices, order=None):
+    """Checks that a network can be contracted by ncon, and raises a ValueError otherwise.
+
+    Every positive index must appear exactly twice, on two tensors or repeated on one, with the same dimension,
+    and every negative index exactly once. The order, if given, must hold each positive index once.
+    """
+    if len(shapes) != len(indices):
+        raise ValueError(f"Got {len(shapes)} tensors but the indices of {len(indices)}.")
+    occurrences: dict[int, list[int]] = {}
+    for t, (shape, tensor_indices) in enumerate(zip(shapes, indices)):
+        if len(shape) != len(tensor_indices):
+            raise ValueError(f"Tensor {t} has {len(shape)} dimensions but {len(tensor_indices)} indices.")
+        for index, dim in zip(tensor_indices, shape):
+            if index == 0:
+                raise ValueError(f"Tensor {t} has index 0, the indices must be positive or negative.")
+            occurrences.setdefault(index, []).append(dim)
+    for index, index_dims in occurrences.items():
+        if len(index_dims) != (2 if index > 0 else 1):
+            kind = "contracted index" if index > 0 else "open index"
+            raise ValueError(f"The {kind} {index} appears {len(index_dims)} times, instead of {2 if index > 0 else 1}.")
+        if len(set(index_dims)) > 1:
+            raise ValueError(f"The index {index} has different dimensions {index_dims}.")
+    if order is not None and sorted(order) != sorted(i for i in occurrences if i > 0):
+        raise ValueError(f"The order {list(order)} must hold each contracted index of the network once.")
+
+
+def order_cost(shapes: list[tuple], indices: list[list[int]], order: list[int] = None) -> tuple[int, int]:
+    """Estimated cost of contracting a network with ncon in a given order.
+
+    ncon takes the first index of the order and contracts at once the two tensors that share it, over all the
+    indices they have in common. A tensor with a repeated index is traced instead.
+
+    Args:
+        shapes (list[tuple]): shape of each tensor.
+        indices (list[list[int]]): indices of each tensor.
+        order (list[int], optional): contraction order. Defaults to the ncon default, [1, 2, 3, ...].
+
+    Returns:
+        tuple[int, int]: number of multiply-adds, and number of elements of the biggest intermediate tensor.
+    """
+    check_network(shapes, indices, order)
+    dims = _network_dimensions(shapes, indices)
+    tensors = [list(tensor_indices) for tensor_indices in indices]
+    order = sorted({i for tensor_indices in indices for i in tensor_indices if i > 0}) if order is None else list(order)
+
+    flops, peak_size = 0, 0
+    while order:
+        holders = [t for t, tensor_indices in enumerate(tensors) if order[0] in tensor_indices]
+        if len(holders) == 1:
+            # Partial trace of a single tensor, ncon traces only the first index of the order at each step:
+            tensor_indices = tensors[holders[0]]
+            traced = {order[0]}
+            flops += prod(dims[i] for i in set(tensor_indices))
+            tensors[holders[0]] = [i for i in tensor_indices if i not in traced]
+            peak_size = max(peak_size, prod(dims[i] for i in tensors[holders[0]]))
+        else:
+            first, second = holders
+            shared = set(tensors[first]) & set(tensors[second])
+            traced = shared
+            flops += prod(dims[i] for i in set(tensors[first]) | set(tensors[second]))
+            result = [i for i in tensors[first] + tensors[second] if i not in shared]
+            tensors = [t for k, t in enumerate(tensors) if k not in holders] + [result]
+            peak_size = max(peak_size, prod(dims[i] for i in result))
+        order = [i for i in order if i not in traced]
+
+    # The disconnected parts are joined with outer products at the end:
+    while len(tensors) > 1:
+        result = tensors.pop() + tensors.pop()
+        size = prod(dims[i] for i in result)
+        flops, peak_size = flops + size, max(peak_size, size)
+        tensors.append(result)
+    return flops, peak_size
+
+
+def _greedy_order(dims: dict, indices: list[list[int]], rng: np.random.Generator = None, temperature: float = 1.0) -> list[int]:
+    """Contraction order that contracts first the connected pair of tensors that shrinks the network the most.
+
+    Without `rng` the best pair is always taken, with it the pairs are chosen with Boltzmann weights of their
+    size reduction, to explore different orders in the restarts.
+    """
+    tensors = [list(tensor_indices) for tensor_indices in indices]
+    order = []
+
+    # Traces are always done first, they only reduce the size of a tensor:
+    for k, tensor_indices in enumerate(tensors):
+        traced = [i for i in dict.fromkeys(tensor_indices) if tensor_indices.count(i) == 2]
+        order.extend(traced)
+        tensors[k] = [i for i in tensor_indices if i not in traced]
+
+    def size(tensor_indices):
+        return prod(dims[i] for i in tensor_indices)
+
+    while True:
+        candidates = []
+        for a in range(len(tensors)):
+            for b in range(a + 1, len(tensors)):
+                shared = set(tensors[a]) & set(tensors[b])
+                if shared:
+                    result = [i for i in tensors[a] + tensors[b] if i not in shared]
+                    candidates.append((size(result) - size(tensors[a]) - size(tensors[b]), a, b, shared, result))
+        if not candidates:
+            return order
+
+        if rng is None:
+            choice = min(range(len(candidates)), key=lambda c: candidates[c][0])
+        else:
+            scores = np.array([c[0] for c in candidates], dtype=float)
+            scale = max(np.std(scores), 1.0) * temperature
+            weights = np.exp(-(scores - scores.min()) / scale)
+            choice = rng.choice(len(candidates), p=weights / weights.sum())
+
+        _, a, b, shared, result = candidates[choice]
+        order.extend(sorted(shared, key=tensors[a].index))
+        tensors = [t for k, t in enumerate(tensors) if k not in (a, b)] + [result]
+
+
+@lru_cache(maxsize=256)
+def _cached_plan(shapes: tuple, indices: tuple, restarts: int, seed: int) -> ContractionPlan:
+    """Plans the contraction of a network, given by hashable shapes and indices."""
+    dims = _network_dimensions(shapes, indices)
+    rng = np.random.default_rng(seed)
+
+    orders = [_greedy_order(dims, indices)] + [_greedy_order(dims, indices, rng) for _ in range(restarts)]
+    candidates = [ContractionPlan(tuple(order), *order_cost(shapes, indices, order)) for order in orders]
+    return min(candidates, key=lambda plan: (plan.flops, plan.peak_size))
+
+
+def plan_contraction(tensors: list, indices: list[list[int]], restarts: int = 16, seed: int = 0) -> ContractionPlan:
+    """Searches a low cost order to contract a network with ncon.
+
+    It tries the greedy order, which contracts first the connected pair that reduces the size of the network
+    the most, and `restarts` randomized greedy orders, and keeps the one with the least multiply-adds. Plans
+    are cached by the structure of the network (indices and shapes), so repeated contractions skip the search.
+    Networks that ncon can not contract raise a ValueError, see `check_network`.
+
+    Args:
+        tensors (list): tensors of the network, or their shapes.
+        indices (list[list[int]]): indices of each tensor, as in ncon.
+        restarts (int, optional): number of randomized greedy searches.
+        seed (int, optional): seed of the randomized searches.
+
+    Returns:
+        ContractionPlan: order for ncon, with its estimated multiply-adds and biggest intermediate size.
+    """
+    shapes = tuple(tuple(np.shape(t)) if hasattr(t, "shape") else tuple(t) for t in tensors)
+    indices = tuple(tuple(tensor_indices) for tensor_indices in indices)
+    check_network(shapes, indices)
+    return _cached_plan(shapes, indices, restarts, seed)
+
+
+def contract(tensors: list, indices: list[list[int]], plan: ContractionPlan = None, **kwargs) -> np.ndarray:
+    """Contracts a network with ncon, in the planned order.
+
+    Args:
+        tensors (list): tensors of the network.
+        indices (list[list[int]]): indices of each tensor, as in ncon.
+        plan (ContractionPlan, optional): plan to follow. If None, it is planned (or taken from the cache).
+        kwargs: arguments of `plan_contraction`.
+
+    Returns:
+        np.ndarray: result of the contraction, with the open indices ordered as -1, -2, ...
+    """
+    if plan is None:
+        plan = plan_contraction(tensors, indices, **kwargs)
+    return ncon(tensors, indices, order=list(plan.order))
@@ -0,0 +1,97 @@
+"""Perfect sampling of MPS.
+
+The MPS are lists of rank 3 tensors with the indices (left link, physical, right link), with open boundary
+conditions, so the first and last links have dimension 1.
+"""
+from typing import Iterator
+
+import numpy as np
+from ncon import ncon
+from numpy import linalg as LA
+
+
+def right_canonical(mps: list[np.ndarray]) -> list[np.ndarray]:
+    """Brings an MPS to its right orthogonal form, with norm 1.
+
+    Sweeping from the right, each tensor is QR decomposed as a matrix (left link) x (physical, right link), and
+    the R matrix is plugged into the left leg of its left neighbour, so the state does not change.
+
+    Args:
+        mps (list[np.ndarray]): tensors of the MPS.
+
+    Returns:
+        list[np.ndarray]: tensors of the MPS in right orthogonal form, where every tensor B fulfills
+            sum_s B[:, s, :] @ B[:, s, :]^dagger = identity.
+    """
+    mps = [np.asarray(tensor) for tensor in mps]
+    for i in range(len(mps) - 1, 0, -1):
+        chi_left, d, chi_right = mps[i].shape
+        Q, R = LA.qr(mps[i].reshape(chi_left, d * chi_right).T)
+        mps[i] = Q.T.reshape(-1, d, chi_right)
+        mps[i - 1] = ncon([mps[i - 1], R.T], [[-1, -2, 1], [1, -3]])
+
+    mps[0] = mps[0] / LA.norm(mps[0])
+    return mps
+
+
+def sample_mps(mps: list[np.ndarray], n_samples: int, batch_size: int = 1024, seed: int = None, canonical: bool = False) -> Iterator[np.ndarray]:
+    """Draws perfect samples of the computational basis from an MPS, streamed in batches.
+
+    With the MPS in right orthogonal form the environment to the right of every site is the identity, so the
+    conditional probabilities of a site are the norms of the left vectors times the site tensor. A batch of
+    left vectors is propagated site by site with batched matrix products, which costs O(N chi^2 d) per sample
+    without recontracting anything.
+
+    Args:
+        mps (list[np.ndarray]): tensors of the MPS.
+        n_samples (int): total number of samples.
+        batch_size (int, optional): number of samples drawn at once, and yielded together.
+        seed (int, optional): seed of the random generator, to get reproducible samples.
+        canonical (bool, optional): whether the MPS is already in right orthogonal form with norm 1.
+
+    Returns:
+        Iterator[np.ndarray]: batches of samples, each one with shape (batch, n_sites) and the physical index of every site.
+    """
+    if not canonical:
+        mps = right_canonical(mps)
+    rng = np.random.default_rng(seed)
+
+    for start in range(0, n_samples, batch_size):
+        size = min(batch_size, n_samples - start)
+        samples = np.empty((size, len(mps)), dtype=np.int64)
+        left = np.ones((size, 1), dtype=mps[0].dtype)
+
+        for i, tensor in enumerate(mps):
+            # Left vectors for each value of the physical index, with shape (batch, d, right link):
+            candidates = np.einsum("bl,lsr->bsr", left, tensor)
+            probabilities = np.sum(np.abs(candidates) ** 2, axis=2)
+            probabilities /= probabilities.sum(axis=1, keepdims=True)
+
+            cumulative = np.cumsum(probabilities, axis=1)
+            outcomes = (rng.random((size, 1)) > cumulative).sum(axis=1).clip(max=tensor.shape[1] - 1)
+            samples[:, i] = outcomes
+
+            left = candidates[np.arange(size), outcomes]
+            left /= LA.norm(left, axis=1, keepdims=True)
+
+        yield samples
+
+
+def sampling_mps(mps: list[np.ndarray], n_samples: int = 10_000, seed: int = None) -> dict[str, float]:
+    """Estimates the probability distribution of the computational basis of an MPS by perfect sampling.
+
+    Args:
+        mps (list[np.ndarray]): tensors of the MPS.
+        n_samples (int, optional): number of samples.
+        seed (int, optional): seed of the random generator.
+
+    Returns:
+        dict[str, float]: sampled probability of each measured basis state, as a string of physical indices.
+    """
+    counts: dict[str, int] = {}
+    for batch in sample_mps(mps, n_samples, seed=seed):
+        states, batch_counts = np.unique(batch, axis=0, return_counts=True)
+        for state, count in zip(states, batch_counts):
+            key = "".join(map(str, state))
+            counts[key] = counts.get(key, 0) + int(count)
+    return {state: count / n_samples for state, count in sorted(counts.items())}
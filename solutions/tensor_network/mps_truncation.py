@@ -0,0 +1,135 @@
+"""Canonical truncation of MPS.
+
+The MPS are lists of rank 3 tensors with the indices (left link, physical, right link), with open boundary
+conditions, so the first and last links have dimension 1.
+"""
+import time
+
+import numpy as np
+from ncon import ncon
+from numpy import linalg as LA
+
+from mps_sampling import right_canonical
+
+
+def randomized_svd(M: np.ndarray, rank: int, oversampling: int = 10, power_iterations: int = 2, rng: np.random.Generator = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Approximates the leading singular values and vectors of a matrix, by projecting it on a random subspace.
+
+    It costs O(m n rank) instead of the O(m n min(m, n)) of a full SVD, so it is worth it when the bond is
+    truncated to a much smaller dimension.
+
+    Args:
+        M (np.ndarray): matrix to decompose.
+        rank (int): number of singular values to compute.
+        oversampling (int, optional): extra dimensions of the random subspace, to improve the accuracy.
+        power_iterations (int, optional): number of multiplications by M M^dagger, to sharpen the spectrum.
+        rng (np.random.Generator, optional): random generator.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: U, S, Vh with `rank` singular values.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    sketch = M @ rng.normal(size=(M.shape[1], rank + oversampling)).astype(M.dtype)
+    Q, _ = LA.qr(sketch)
+    for _ in range(power_iterations):
+        Q, _ = LA.qr(M.conj().T @ Q)
+        Q, _ = LA.qr(M @ Q)
+    U, S, Vh = LA.svd(Q.conj().T @ M, full_matrices=False)
+    return (Q @ U)[:, :rank], S[:rank], Vh[:rank]
+
+
+def truncate_mps(
+    mps: list[np.ndarray],
+    max_chi: int = None,
+    error_budget: float = 0.0,
+    randomized: bool = False,
+    normalize: bool = True,
+    seed: int = None,
+) -> tuple[list[np.ndarray], list[float]]:
+    """Truncates the links of an MPS with the canonical truncation algorithm, within a global error budget.
+
+    The MPS is brought to right orthogonal form with QR sweeps, and then the orthogonality center is moved to
+    the right one site at a time. At each link the center is decomposed with an SVD, and only the largest
+    singular values are kept, so the truncation is optimal for the whole state. The budget of discarded weight
+    (sum of the discarded squared singular values) still unused is shared equally among the remaining links.
+
+    Args:
+        mps (list[np.ndarray]): tensors of the MPS.
+        max_chi (int, optional): maximum link dimension. If None, only the error budget limits the truncation.
+        error_budget (float, optional): maximum total discarded weight, 1 - fidelity is approximately this sum.
+        randomized (bool, optional): use a randomized SVD, only applied when `max_chi` is smaller than the link.
+        normalize (bool, optional): whether to normalize the truncated MPS.
+        seed (int, optional): seed of the randomized SVD.
+
+    Returns:
+        tuple[list[np.ndarray], list[float]]: truncated MPS in left orthogonal form, and discarded weight of each link.
+    """
+    mps = right_canonical(mps)
+    rng = np.random.default_rng(seed)
+    remaining_budget = error_budget
+    discarded_weights = []
+
+    for i in range(len(mps) - 1):
+        chi_left, d, chi_right = mps[i].shape
+        M = mps[i].reshape(chi_left * d, chi_right)
+        total_weight = LA.norm(M) ** 2
+        cap = min(M.shape) if max_chi is None else min(max_chi, *M.shape)
+
+        if randomized and cap < min(M.shape) // 2:
+            U, S, Vh = randomized_svd(M, cap, rng=rng)
+        else:
+            U, S, Vh = LA.svd(M, full_matrices=False)
+
+        # Smallest dimension whose discarded weight fits in this link's share of the budget:
+        tails = total_weight - np.cumsum(S**2)
+        link_budget = remaining_budget / (len(mps) - 1 - i)
+        chi = min(int(np.argmax(tails <= link_budget)) + 1 if np.any(tails <= link_budget) else len(S), cap)
+
+        discarded = max(float(tails[chi - 1]), 0.0)
+        discarded_weights.append(discarded)
+        remaining_budget = max(remaining_budget - discarded, 0.0)
+
+        mps[i] = U[:, :chi].reshape(chi_left, d, chi)
+        mps[i + 1] = ncon([np.diag(S[:chi]) @ Vh[:chi], mps[i + 1]], [[-1, 1], [1, -2, -3]])
+
+    if normalize:
+        mps[-1] = mps[-1] / LA.norm(mps[-1])
+    return mps, discarded_weights
+
+
+def overlap(mps_1: list[np.ndarray], mps_2: list[np.ndarray]) -> complex:
+    """Overlap <mps_1|mps_2> of two MPS with the same number of sites, contracting the transfer matrices."""
+    environment = np.ones((1, 1))
+    for tensor_1, tensor_2 in zip(mps_1, mps_2):
+        environment = ncon([environment, tensor_1.conj(), tensor_2], [[1, 2], [1, 3, -1], [2, 3, -2]])
+    return complex(environment[0, 0])
+
+
+def benchmark_truncation(n_sites: int = 100, chi: int = 256, max_chi: int = 64, d: int = 2, seed: int = 0):
+    """Times the truncation of a random MPS of a long chain, with the full and the randomized SVD.
+
+    Args:
+        n_sites (int, optional): number of sites of the chain.
+        chi (int, optional): link dimension of the random MPS.
+        max_chi (int, optional): link dimension after the truncation.
+        d (int, optional): physical dimension.
+        seed (int, optional): seed of the random MPS.
+    """
+    rng = np.random.default_rng(seed)
+    dims = [1] + [min(chi, d ** min(i, n_sites - i)) for i in range(1, n_sites)] + [1]
+    mps = [rng.normal(size=(dims[i], d, dims[i + 1])) for i in range(n_sites)]
+    reference = right_canonical(mps)
+
+    for randomized in (False, True):
+        start = time.perf_counter()
+        truncated, discarded = truncate_mps(mps, max_chi=max_chi, randomized=randomized, seed=seed)
+        elapsed = time.perf_counter() - start
+        fidelity = abs(overlap(reference, truncated)) ** 2
+        print(
+            f"{'randomized' if randomized else 'full'} SVD: {elapsed:.2f} s, "
+            f"discarded weight {sum(discarded):.3e}, fidelity {fidelity:.6f}"
+        )
+
+
+if __name__ == "__main__":
+    benchmark_truncation()